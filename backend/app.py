@@ -1,23 +1,76 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, Blueprint, Response, current_app, has_app_context, g, request, jsonify, render_template, session, redirect, url_for, send_from_directory, stream_with_context
 from flask_cors import CORS
 import json
+import csv
 import os
 from datetime import datetime, date
 import hashlib
 import logging
 import base64
-from PIL import Image
+import bisect
 import io
+import threading
+import time
+import uuid
+import gzip
+import mimetypes
+import functools
+import marshal
+import atexit
+import shutil
+import tempfile
+import queue
+import random
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-app = Flask(__name__)
-app.secret_key = 'your-secret-key-change-in-production'  # Change this in production
-CORS(app, supports_credentials=True)
+import metrics
+import backup
+import shared_state
+import snapshot
 
-# Data file paths
-DATA_FILE = 'students.json'
-USERS_FILE = 'users.json'
-ATTENDANCE_FILE = 'attendance.json'
-FACE_DATA_FILE = 'face_data.json'
+# Image libraries (Pillow, NumPy) are imported inside the functions that need
+# them so that requests which never touch images don't pay for them on a
+# serverless cold start.
+
+bp = Blueprint('main', __name__)
+
+# Data file names, relative to the DATA_DIR config value
+STORE_FILES = {
+    'students': 'students.json',
+    'users': 'users.json',
+    'attendance': 'attendance.json',
+    'face_data': 'face_data.json',
+    'enrollment_jobs': 'enrollment_jobs.json',
+    'changes': 'changes.log'
+}
+
+# Defaults for create_app(); DATA_DIR is also used outside an app context
+# (e.g. by enroll_faces.py)
+DATA_DIR = os.environ.get('DATA_DIR', '')
+DEFAULT_CONFIG = {
+    'SECRET_KEY': os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production'),  # Change this in production
+    'DATA_DIR': DATA_DIR,
+    'LOG_FILE': 'master.log',  # None logs to the console instead
+    'SNAPSHOT_FILE': 'snapshot.bin',  # relative to DATA_DIR, None disables snapshots
+    'SNAPSHOT_INTERVAL': 300,  # seconds between background snapshots, 0 only loads them
+    'BACKUP_DIR': 'backups',  # relative to DATA_DIR
+    'BACKUP_INTERVAL': 0,  # seconds between scheduled backups, 0 disables them
+    'BACKUP_KEEP': 30,  # scheduled backups kept
+    'PROFILE_DIR': None,  # directory for request profiles, None disables profiling
+    'PROFILE_SAMPLE_RATE': 0.0,  # fraction of requests profiled without the X-Profile header
+    'TENANT_ROUTING': None,  # 'host' or 'path' to serve one campus per TENANTS_DIR subdirectory
+    'TENANTS_DIR': 'tenants',
+    'TENANT_CACHE_SIZE': 16,  # campuses whose caches are kept in memory
+    'SHARED_BACKEND_URL': os.environ.get('SHARED_BACKEND_URL'),  # redis:// or memory://, see shared_state.py
+    'WORKER_THREADS': int(os.environ.get('WORKER_THREADS', 0)) or None,  # request threads per worker (gunicorn --threads), None if unbounded
+    'TRUST_LOCALHOST': os.environ.get('TRUST_LOCALHOST', '').lower() in ('1', 'true')  # localhost clients may read /metrics and profile requests
+}
+
+# Roll numbers are ROLL_PREFIX followed by a three digit sequence
+ROLL_PREFIX = '2024'
 
 # Default users (in production, use proper password hashing)
 DEFAULT_USERS = {
@@ -41,67 +94,959 @@ DEFAULT_USERS = {
     }
 }
 
-# Set up logging for CRUD operations
-LOG_FILE = 'master.log'
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s'
-)
-
 # Face recognition disabled for Vercel deployment
 # OpenCV dependencies removed for serverless compatibility
 
+@functools.lru_cache(maxsize=None)
+def get_brotli():
+    """Import the optional Brotli module on first use, or None if not installed"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+def get_data_dir():
+    """Get the data directory of the current campus"""
+    if not has_app_context():
+        return DATA_DIR
+    return g.get('data_dir') or current_app.config['DATA_DIR']
+
+@functools.lru_cache(maxsize=None)
+def get_fcntl():
+    """Import fcntl for cross-process file locks, or None where it does not exist (Windows)"""
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    return fcntl
+
+def store_file(store):
+    """Get the file path backing a data store"""
+    return os.path.join(get_data_dir(), STORE_FILES[store])
+
+# Per-process metrics served at /metrics in the Prometheus text format
+METRICS = metrics.Registry()
+REQUEST_LATENCY = METRICS.histogram('http_request_duration_seconds', 'Request latency by route', ('method', 'route'))
+REQUEST_COUNT = METRICS.counter('http_requests_total', 'Requests by route and status code', ('method', 'route', 'status'))
+REQUESTS_IN_FLIGHT = METRICS.gauge('http_requests_in_flight', 'Requests currently being handled')
+STORE_LOADS = METRICS.counter('store_loads_total', 'Data store loads by source (cache or file)', ('store', 'source'))
+STORE_SAVES = METRICS.counter('store_saves_total', 'Data store saves', ('store',))
+STORE_BYTES_READ = METRICS.counter('store_read_bytes_total', 'JSON bytes read from data store files', ('store',))
+STORE_BYTES_WRITTEN = METRICS.counter('store_written_bytes_total', 'JSON bytes written to data store files', ('store',))
+ATTENDANCE_COMMITS = METRICS.counter('attendance_commits_total', 'Group commits of attendance marks')
+ATTENDANCE_MARKS_COMMITTED = METRICS.counter('attendance_marks_committed_total', 'Attendance marks written by group commits')
+SHARED_INVALIDATIONS = METRICS.counter('shared_invalidations_total', 'Store caches dropped because another node saved the store')
+TENANT_EVICTIONS = METRICS.counter('tenant_evictions_total', 'Campuses whose caches were dropped to make room for another')
+STORE_JSON_SECONDS = METRICS.counter('store_json_seconds_total', 'Time spent parsing and serializing store JSON', ('store', 'operation'))
+
+# Parsed stores are cached as marshal bytes keyed by file path, along with
+# the file stamp and a digest of its JSON. Every load unmarshals a private
+# copy (callers mutate what they load), which is several times faster than
+# parsing the JSON again. Snapshots seed this cache at startup.
+_store_cache = {}
+_store_cache_lock = threading.Lock()
+
+# Digests of store files that are not in _store_cache (e.g. the change log),
+# as (stamp, digest) keyed by file path; guarded by _store_cache_lock
+_digest_cache = {}
+
+def read_store(store):
+    """Load a data store from its JSON file, or None if the file does not exist"""
+    path = store_file(store)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return None
+    with _store_cache_lock:
+        entry = _store_cache.get(path)
+    if entry and entry['stamp'] == stamp:
+        STORE_LOADS.inc(store, 'cache')
+        return marshal.loads(entry['data'])
+    with open(path, 'rb') as f:
+        raw = f.read()
+    started = time.perf_counter()
+    data = json.loads(raw)
+    STORE_JSON_SECONDS.inc(store, 'parse', amount=time.perf_counter() - started)
+    STORE_LOADS.inc(store, 'file')
+    STORE_BYTES_READ.inc(store, amount=len(raw))
+    with _store_cache_lock:
+        _store_cache[path] = {'stamp': stamp, 'digest': hashlib.sha256(raw).hexdigest(), 'data': marshal.dumps(data)}
+    return data
+
+# Writers hold the store write lock while replacing a store file: a thread
+# lock in this process plus, where fcntl exists, an flock on .write.lock in
+# the data directory shared with other workers. Files are replaced
+# atomically, so readers never take the lock and never see a torn file;
+# holding it just gives backups a consistent view of all stores at once.
+_store_write_lock = threading.RLock()
+_store_write_depth = threading.local()
+
+@contextmanager
+def store_write_lock():
+    """Hold the write lock of the current data directory (reentrant)"""
+    with _store_write_lock:
+        depth = getattr(_store_write_depth, 'value', 0)
+        fcntl = get_fcntl() if depth == 0 else None
+        lock_file = open(os.path.join(get_data_dir(), '.write.lock'), 'a') if fcntl else None
+        try:
+            if lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            _store_write_depth.value = depth + 1
+            yield
+        finally:
+            _store_write_depth.value = depth
+            if lock_file:
+                lock_file.close()  # releases the flock
+
+def fsync_directory(path):
+    """Flush a directory entry change (e.g. a rename into it) to disk, where the OS allows it"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on Windows
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_store(store, data):
+    """Atomically replace a data store's JSON file"""
+    path = store_file(store)
+    started = time.perf_counter()
+    raw = json.dumps(data, indent=2).encode()
+    STORE_JSON_SECONDS.inc(store, 'dump', amount=time.perf_counter() - started)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with store_write_lock():
+        with open(tmp_path, 'wb') as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        # Until the directory is synced a power loss can undo the replace
+        fsync_directory(os.path.dirname(path) or '.')
+        stamp = file_stamp(path)
+    STORE_SAVES.inc(store)
+    STORE_BYTES_WRITTEN.inc(store, amount=len(raw))
+    with _store_cache_lock:
+        _store_cache[path] = {'stamp': stamp, 'digest': hashlib.sha256(raw).hexdigest(), 'data': marshal.dumps(data)}
+    bump_revision(store)
+
+JSON_STREAM_CHUNK = 64 * 1024  # characters read at a time by iter_store_items
+
+def store_digest(store):
+    """Get a digest of a data store's file, or None if it does not exist, hashing it only when its stamp changes"""
+    path = store_file(store)
+    stamp = file_stamp(path)
+    if stamp is None:
+        return None
+    with _store_cache_lock:
+        entry = _store_cache.get(path)
+        if entry and entry['stamp'] == stamp:
+            return entry['digest']
+        cached = _digest_cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    with _store_cache_lock:
+        _digest_cache[path] = (stamp, digest)
+    return digest
+
+def iter_store_items(store):
+    """Yield the (key, value) pairs of an object store one at a time, straight from its file
+
+    Unlike read_store this never holds more than one value (e.g. one day of
+    attendance) in memory.
+    """
+    path = store_file(store)
+    if file_stamp(path) is None:
+        return
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+        
+        def skip(chars):
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos:pos + 1]
+                chunk = f.read(JSON_STREAM_CHUNK)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+        
+        if skip(' \t\r\n') != '{':
+            raise ValueError(f"{path} does not hold a JSON object")
+        pos += 1
+        while True:
+            char = skip(' \t\r\n,')
+            if char == '}':
+                break
+            if not char:
+                raise ValueError(f"{path} ends before its closing brace")
+            # Decode "key": value, reading more of the file until it is complete
+            while True:
+                try:
+                    key, end = decoder.raw_decode(buffer, pos)
+                    while end < len(buffer) and buffer[end] in ' \t\r\n':
+                        end += 1
+                    if end >= len(buffer) or buffer[end] != ':':
+                        raise ValueError(f"Expected ':' after key in {path}")
+                    end += 1
+                    while end < len(buffer) and buffer[end] in ' \t\r\n':
+                        end += 1
+                    value, end = decoder.raw_decode(buffer, end)
+                    if end < len(buffer) or eof:
+                        break
+                except ValueError:
+                    if eof:
+                        raise
+                chunk = f.read(JSON_STREAM_CHUNK)
+                eof = not chunk
+                buffer, pos = buffer[pos:] + chunk, 0
+            yield key, value
+            pos = end
+
 def load_students():
     """Load students from JSON file"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    students = read_store('students')
+    return students if students is not None else []
 
 def save_students(students):
     """Save students to JSON file"""
-    with open(DATA_FILE, 'w') as f:
-        json.dump(students, f, indent=2)
+    write_store('students', students)
 
 def load_users():
     """Load users from JSON file or create default users"""
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    else:
+    users = read_store('users')
+    if users is None:
         # Create default users file
         save_users(DEFAULT_USERS)
         return DEFAULT_USERS
+    return users
 
 def save_users(users):
     """Save users to JSON file"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    write_store('users', users)
 
 def load_attendance():
     """Load attendance data from JSON file"""
-    if os.path.exists(ATTENDANCE_FILE):
-        with open(ATTENDANCE_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    attendance = read_store('attendance')
+    return attendance if attendance is not None else {}
 
 def save_attendance(attendance):
     """Save attendance data to JSON file"""
-    with open(ATTENDANCE_FILE, 'w') as f:
-        json.dump(attendance, f, indent=2)
+    # Dates are kept in order on disk so exports can stream them
+    write_store('attendance', dict(sorted(attendance.items())))
+    # Keep today's attendance cache coherent with what we just wrote
+    path = store_file('attendance')
+    today = date.today().isoformat()
+    with _today_cache_lock:
+        _today_cache[path] = {
+            'date': today,
+            'stamp': file_stamp(path),
+            'records': dict(attendance.get(today, {}))
+        }
 
 def load_face_data():
     """Load face data from JSON file"""
-    if os.path.exists(FACE_DATA_FILE):
-        with open(FACE_DATA_FILE, 'r') as f:
-            return json.load(f)
-    return {}
+    face_data = read_store('face_data')
+    return face_data if face_data is not None else {}
 
 def save_face_data(face_data):
     """Save face data to JSON file"""
-    with open(FACE_DATA_FILE, 'w') as f:
-        json.dump(face_data, f, indent=2)
+    write_store('face_data', face_data)
+    # Keep the enrollment cache coherent with what we just wrote
+    path = store_file('face_data')
+    with _face_cache_lock:
+        _face_cache[path] = {'stamp': file_stamp(path), 'data': face_data}
+
+# In-memory face enrollment cache, keyed by file path. Other workers write
+# face_data.json too, so entries are revalidated against the file's
+# mtime/size on every lookup.
+_face_cache = {}
+_face_cache_lock = threading.Lock()
+
+def file_stamp(path):
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+# Per-store revision counters keyed by file path, bumped by every save_* in
+# this process and whenever the file is seen to have been rewritten by
+# another worker.
+_revisions = {}
+_revisions_lock = threading.Lock()
+
+# With a shared backend (see shared_state.py) revisions are counted there
+# instead, so every node hands out the same ETags, and each save is
+# broadcast so other nodes drop their cached copies of the store at once.
+# _shared_revisions mirrors the counters, kept current by the listener.
+NODE_ID = uuid.uuid4().hex
+_shared_backend = None
+_shared_revisions = {}
+
+def bump_revision(store):
+    """Record a write to a data store and return its new revision"""
+    path = store_file(store)
+    stamp = file_stamp(path)
+    with _revisions_lock:
+        rev = _revisions.get(path, (0, None))[0] + 1
+        _revisions[path] = (rev, stamp)
+    if _shared_backend is not None:
+        try:
+            rev = _shared_backend.incr(shared_state.REVISION_PREFIX + path)
+            with _revisions_lock:
+                _shared_revisions[path] = rev
+            _shared_backend.publish(shared_state.INVALIDATE_CHANNEL, json.dumps({'node': NODE_ID, 'path': path, 'rev': rev}))
+        except Exception as e:
+            logging.warning(f"Could not publish revision of {path}: {e}")
+    return rev
+
+def get_revision(store):
+    """Get the current (revision, file stamp) of a data store without loading it"""
+    path = store_file(store)
+    stamp = file_stamp(path)
+    if _shared_backend is not None:
+        with _revisions_lock:
+            rev = _shared_revisions.get(path)
+        if rev is None:
+            rev = int(_shared_backend.get(shared_state.REVISION_PREFIX + path) or 0)
+            with _revisions_lock:
+                _shared_revisions.setdefault(path, rev)
+        return rev, stamp
+    with _revisions_lock:
+        rev, known_stamp = _revisions.get(path, (0, None))
+        if stamp != known_stamp:
+            rev += 1
+            _revisions[path] = (rev, stamp)
+        return rev, stamp
+
+def invalidate_store_path(path):
+    """Drop every cached copy of the store file at path"""
+    for cache, lock in ((_store_cache, _store_cache_lock), (_face_cache, _face_cache_lock),
+                        (_today_cache, _today_cache_lock), (_student_views, _student_views_lock),
+                        (_change_log_cache, _change_log_lock)):
+        with lock:
+            cache.pop(path, None)
+
+def start_invalidation_listener(client):
+    """Apply revisions and cache invalidations published by other nodes"""
+    pubsub = client.pubsub()
+    pubsub.subscribe(shared_state.INVALIDATE_CHANNEL)
+    
+    def run():
+        while True:
+            try:
+                message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if not message or message['type'] != 'message':
+                    continue
+                event = json.loads(message['data'])
+                with _revisions_lock:
+                    _shared_revisions[event['path']] = max(event['rev'], _shared_revisions.get(event['path'], 0))
+                if event['node'] != NODE_ID:
+                    invalidate_store_path(event['path'])
+                    SHARED_INVALIDATIONS.inc()
+            except Exception:
+                logging.exception('Cache invalidation listener failed')
+                time.sleep(1)
+    
+    threading.Thread(target=run, name='invalidation-listener', daemon=True).start()
+
+def configure_shared_backend(app):
+    """Keep sessions, revisions and cache invalidation in the shared backend"""
+    global _shared_backend
+    client = shared_state.connect(app.config['SHARED_BACKEND_URL'])
+    app.session_interface = shared_state.SharedSessionInterface(client)
+    if _shared_backend is not client:
+        _shared_backend = client
+        with _revisions_lock:
+            _shared_revisions.clear()
+        start_invalidation_listener(client)
+
+def get_face_registry():
+    """Get face data from the enrollment cache (read-only, do not mutate)"""
+    path = store_file('face_data')
+    stamp = file_stamp(path)
+    with _face_cache_lock:
+        entry = _face_cache.get(path)
+        if not entry or stamp != entry['stamp']:
+            entry = _face_cache[path] = {'stamp': stamp, 'data': load_face_data() if stamp else {}}
+        return entry['data']
+
+# In-memory copy of today's attendance records keyed by file path, used to
+# short-circuit repeat check-ins. Revalidated against the file's mtime/size
+# and the current date.
+_today_cache = {}
+_today_cache_lock = threading.Lock()
+
+def get_today_attendance():
+    """Get today's attendance records keyed by student ID (read-only, do not mutate)"""
+    path = store_file('attendance')
+    today = date.today().isoformat()
+    stamp = file_stamp(path)
+    with _today_cache_lock:
+        entry = _today_cache.get(path)
+        if not entry or today != entry['date'] or stamp != entry['stamp']:
+            attendance = load_attendance() if stamp else {}
+            entry = _today_cache[path] = {'date': today, 'stamp': stamp, 'records': attendance.get(today, {})}
+        return entry['records']
+
+# Students as the API serves them: age and the created_by/updated_by
+# display names are computed once per students/users revision and day,
+# from DOBs parsed to (ordinal, year, month, day) at the same time,
+# instead of on every request. Keyed by the students file path.
+_student_views = {}
+_student_views_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=4096)
+def parse_dob(dob_str):
+    """Parse a YYYY-MM-DD date of birth to (ordinal, year, month, day), or None if it is invalid"""
+    try:
+        dob = datetime.strptime(dob_str, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+    return dob.toordinal(), dob.year, dob.month, dob.day
+
+def age_on(dob, today):
+    """Age in whole years on today for a parse_dob() result, or None"""
+    if dob is None or dob[0] > today.toordinal():
+        return None
+    return today.year - dob[1] - ((today.month, today.day) < dob[2:])
+
+def build_student_views(students, users, today):
+    """Return students with age and resolved names, as new dicts"""
+    names = {username: user.get('name', username) for username, user in users.items()}
+    views = []
+    for student in students:
+        view = dict(student)
+        view['age'] = age_on(parse_dob(student['dob']), today) if 'dob' in student else None
+        for field in ('created_by', 'updated_by'):
+            if field in view:
+                view[field] = names.get(view[field], view[field])
+        views.append(view)
+    return views
+
+def index_students(views):
+    """Build the secondary indexes query_students() intersects
+
+    by_class and by_creator (display name) map to sets of IDs; dobs and
+    created are (key, ID) pairs sorted by DOB ordinal and created_at for
+    range bisection.
+    """
+    by_class, by_creator, dobs, created = {}, {}, [], []
+    for view in views:
+        student_id = view['id']
+        by_class.setdefault(view['class'], set()).add(student_id)
+        if 'created_by' in view:
+            by_creator.setdefault(view['created_by'], set()).add(student_id)
+        dob = parse_dob(view['dob']) if 'dob' in view else None
+        if dob:
+            dobs.append((dob[0], student_id))
+        if view.get('created_at'):
+            created.append((view['created_at'], student_id))
+    dobs.sort()
+    created.sort()
+    return {
+        'by_id': {view['id']: view for view in views},
+        'position': {view['id']: i for i, view in enumerate(views)},
+        'by_roll': {view['roll_number']: view['id'] for view in views if 'roll_number' in view},
+        'by_class': by_class,
+        'by_creator': by_creator,
+        'dob_keys': [key for key, _ in dobs],
+        'dob_ids': [student_id for _, student_id in dobs],
+        'created_keys': [key for key, _ in created],
+        'created_ids': [student_id for _, student_id in created]
+    }
+
+def get_student_views():
+    """Get every student with derived fields and indexes, refreshed on writes and at midnight (read-only, do not mutate)"""
+    path = store_file('students')
+    today = date.today()
+    key = (today, get_revision('students'), get_revision('users'))
+    with _student_views_lock:
+        entry = _student_views.get(path)
+        if not entry or entry['key'] != key:
+            views = build_student_views(load_students(), load_users(), today)
+            entry = _student_views[path] = {'key': key, 'views': views, **index_students(views)}
+        return entry
+
+def ids_in_range(keys, ids, low=None, high=None):
+    """IDs whose sorted key is >= low and < high (either bound may be None)"""
+    start = bisect.bisect_left(keys, low) if low is not None else 0
+    end = bisect.bisect_left(keys, high) if high is not None else len(keys)
+    return set(ids[start:end])
+
+MAX_QUERY_AGE = 150  # years; larger age bounds would fall outside the date range
+
+def years_before(day, years):
+    """The same calendar day `years` earlier (Feb 28 for Feb 29 in a non-leap year)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+def students_in_order(entry, ids):
+    """Student views for a set of IDs, in roster order"""
+    position = entry['position']
+    return [entry['by_id'][student_id] for student_id in sorted(ids, key=position.__getitem__)]
+
+def query_students(entry, class_name=None, dob_from=None, dob_to=None, created_by=None,
+                   created_from=None, created_to=None, face_enrolled=None, face_registry=None):
+    """Students matching every given filter, answered by intersecting index lookups
+
+    DOB bounds are dates, inclusive; created bounds are ISO strings, from
+    inclusive and to exclusive. face_enrolled needs the face registry.
+    """
+    matches = []
+    if class_name is not None:
+        matches.append(entry['by_class'].get(class_name, set()))
+    if created_by is not None:
+        matches.append(entry['by_creator'].get(created_by, set()))
+    if dob_from is not None or dob_to is not None:
+        matches.append(ids_in_range(entry['dob_keys'], entry['dob_ids'],
+                                    dob_from.toordinal() if dob_from else None,
+                                    dob_to.toordinal() + 1 if dob_to else None))
+    if created_from is not None or created_to is not None:
+        matches.append(ids_in_range(entry['created_keys'], entry['created_ids'], created_from, created_to))
+    if face_enrolled is not None:
+        by_roll = entry['by_roll']
+        enrolled = {by_roll[roll] for roll in face_registry if roll in by_roll}
+        matches.append(enrolled if face_enrolled else entry['by_id'].keys() - enrolled)
+    if not matches:
+        return entry['views']
+    matches.sort(key=len)
+    return students_in_order(entry, matches[0].intersection(*matches[1:]))
+
+# Change feed for delta sync. Every write to students, attendance or users
+# appends compact change records to changes.log within the same store
+# write lock hold as the write itself, so records are in the order of the
+# writes and sequence numbers are unique across workers.
+#
+# The log is append-only, one JSON object per line, in two segments: once
+# the active changes.log holds CHANGE_FEED_SIZE records it becomes
+# changes.log.1, replacing the previous one. Each segment starts with a
+# header {'first_seq': int, 'stamps': {store: file stamp}}. Records carry
+# the stamp of their store file after the write, so a write whose record
+# never made it to the log (a crash in between, or an edit outside the
+# app) shows up as a stamp mismatch; the feed is then reset, which is why
+# appends need no fsync. A client whose cursor is older than the retained
+# records, or from before a reset, has to reload in full.
+#
+# Change record: {'seq': int, 'store': str, 'op': 'upsert' | 'delete',
+#                 'id': student ID or username, 'at': ISO timestamp,
+#                 'data': record (upserts), 'date': day (attendance),
+#                 'stamp': [mtime_ns, size]}
+# An attendance delete without a date removes every day of that student.
+CHANGE_FEED_SIZE = int(os.environ.get('CHANGE_FEED_SIZE', 1000))
+CHANGE_FEED_STORES = ('students', 'attendance', 'users')
+USER_CHANGE_FIELDS = ('username', 'name', 'role')  # never passwords
+
+# Parsed change log segments keyed by file path. The active segment only
+# grows, so a changed file is read from the last parsed offset on.
+_change_log_cache = {}
+_change_log_lock = threading.Lock()
+
+def read_change_segment(path):
+    """Return (header, records) of a change log segment, or None if it does not exist"""
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        with _change_log_lock:
+            _change_log_cache.pop(path, None)
+        return None
+    with f, _change_log_lock:
+        st = os.fstat(f.fileno())
+        entry = _change_log_cache.get(path)
+        if not entry or entry['ino'] != st.st_ino or st.st_size < entry['offset']:
+            entry = _change_log_cache[path] = {'ino': st.st_ino, 'offset': 0, 'header': None, 'records': []}
+        if st.st_size > entry['offset']:
+            f.seek(entry['offset'])
+            chunk = f.read(st.st_size - entry['offset'])
+            # A line still being appended by another worker is read next time
+            complete = chunk.rfind(b'\n') + 1
+            for line in chunk[:complete].splitlines():
+                item = json.loads(line)
+                if entry['header'] is None:
+                    entry['header'] = item
+                else:
+                    entry['records'].append(item)
+            entry['offset'] += complete
+        if entry['header'] is None:
+            return None
+        return entry['header'], list(entry['records'])
+
+def load_change_feed():
+    """Load the change feed, or None if it has not been started
+
+    Returns {'first_seq': int, 'last_seq': int, 'changes': [...],
+    'active': records in the active segment, 'stamps': {store: stamp}}.
+    """
+    path = store_file('changes')
+    active = read_change_segment(path)
+    if active is None:
+        return None
+    header, changes = active
+    stamps = dict(header['stamps'])
+    for change in changes:
+        stamps[change['store']] = change['stamp']
+    first_seq = header['first_seq']
+    previous = read_change_segment(f"{path}.1")
+    # The previous segment only counts if it ends right where this one starts
+    if previous and previous[0]['first_seq'] + len(previous[1]) == first_seq:
+        first_seq = previous[0]['first_seq']
+        changes = previous[1] + changes
+    return {'first_seq': first_seq, 'last_seq': first_seq + len(changes) - 1, 'changes': changes,
+            'active': len(active[1]), 'stamps': stamps}
+
+def current_store_stamps():
+    """File stamps of the stores in the change feed, as stored in the log"""
+    stamps = {}
+    for store in CHANGE_FEED_STORES:
+        stamp = file_stamp(store_file(store))
+        stamps[store] = list(stamp) if stamp else None
+    return stamps
+
+def write_change_segment(path, header):
+    """Start a change log segment holding only its header"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(json.dumps(header) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def reset_change_feed():
+    """Drop every change record, so all clients resync, and return the new last sequence number
+
+    Called after stores were rewritten wholesale (restores) or changed
+    without a record; one sequence number is skipped so that no cursor
+    stays valid.
+    """
+    path = store_file('changes')
+    with store_write_lock():
+        feed = load_change_feed()
+        first_seq = feed['last_seq'] + 2 if feed else 1
+        if os.path.exists(f"{path}.1"):
+            os.remove(f"{path}.1")
+        write_change_segment(path, {'first_seq': first_seq, 'stamps': current_store_stamps()})
+    bump_revision('changes')
+    return first_seq - 1
+
+def record_changes(store, changes):
+    """Append change records (see above) for a store that was just written, returning the last sequence number
+
+    Call while still holding the store write lock taken for the write.
+    """
+    stamp = file_stamp(store_file(store))
+    at = datetime.now().isoformat()
+    path = store_file('changes')
+    with store_write_lock():
+        feed = load_change_feed()
+        if feed is None:
+            reset_change_feed()
+            feed = load_change_feed()
+        if feed['active'] >= CHANGE_FEED_SIZE:
+            os.replace(path, f"{path}.1")
+            write_change_segment(path, {'first_seq': feed['last_seq'] + 1, 'stamps': feed['stamps']})
+        seq = feed['last_seq']
+        lines = []
+        for change in changes:
+            seq += 1
+            lines.append(json.dumps({'seq': seq, 'at': at, 'store': store, **change,
+                                     'stamp': list(stamp) if stamp else None}) + '\n')
+        with open(path, 'a') as f:
+            f.write(''.join(lines))
+    bump_revision('changes')
+    return seq
+
+def record_change(store, op, record_id, data=None, **extra):
+    """Append one change record to the feed (under the store write lock, see record_changes)"""
+    change = {'op': op, 'id': record_id, **extra}
+    if data is not None:
+        change['data'] = data
+    return record_changes(store, [change])
+
+def get_synced_change_feed():
+    """Load the change feed, resetting it first if a store was written without a record"""
+    feed = load_change_feed()
+    if feed is None or feed['stamps'] != current_store_stamps():
+        with store_write_lock():
+            # A writer may just have been between its write and its record
+            feed = load_change_feed()
+            if feed is None or feed['stamps'] != current_store_stamps():
+                reset_change_feed()
+                feed = load_change_feed()
+    return feed
+
+def user_change_data(user):
+    """The fields of a user shared through the change feed"""
+    return {field: user[field] for field in USER_CHANGE_FIELDS if field in user}
+
+# Multi-campus tenancy. With TENANT_ROUTING set, each request is served
+# from TENANTS_DIR/<campus>, the campus being the first label of the host
+# name ('host') or the first path segment ('path', for API clients; the
+# browser pages use absolute URLs). Every cache above is keyed by file path
+# and so already per campus; the least recently used campuses beyond
+# TENANT_CACHE_SIZE have their entries dropped. Health checks, metrics and
+# static files are served outside any campus, so in 'path' mode their
+# first segments are never taken for campus names.
+TENANT_NAME = re.compile(r'^[a-z0-9][a-z0-9-]{0,62}$')
+TENANT_EXEMPT_ENDPOINTS = ('static', 'main.health_check', 'main.prometheus_metrics')
+TENANT_EXEMPT_SEGMENTS = ('health', 'metrics', 'static')
+_tenants = OrderedDict()
+_tenants_lock = threading.Lock()
+
+class TenantPathMiddleware:
+    """WSGI middleware moving a leading /<campus> path segment into SCRIPT_NAME"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        tenant, sep, rest = path.lstrip('/').partition('/')
+        if tenant not in TENANT_EXEMPT_SEGMENTS and TENANT_NAME.match(tenant):
+            environ['app.tenant'] = tenant
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/' + tenant
+            environ['PATH_INFO'] = '/' + rest
+        return self.wsgi_app(environ, start_response)
+
+def evict_tenant_caches(data_dir):
+    """Drop every cached entry for files under data_dir"""
+    prefix = os.path.join(data_dir, '')
+    for cache, lock in ((_store_cache, _store_cache_lock), (_digest_cache, _store_cache_lock),
+                        (_face_cache, _face_cache_lock), (_today_cache, _today_cache_lock),
+                        (_student_views, _student_views_lock), (_change_log_cache, _change_log_lock),
+                        (_revisions, _revisions_lock)):
+        with lock:
+            for path in [path for path in cache if path.startswith(prefix)]:
+                del cache[path]
+
+def activate_tenant(tenant):
+    """Mark a campus as most recently used and return its data directory, or None if it does not exist"""
+    tenants_dir = current_app.config['TENANTS_DIR']
+    with _tenants_lock:
+        data_dir = _tenants.get(tenant)
+        if data_dir:
+            _tenants.move_to_end(tenant)
+            return data_dir
+    data_dir = os.path.join(tenants_dir, tenant)
+    if not os.path.isdir(data_dir):
+        return None
+    g.data_dir = data_dir
+    try:
+        load_data_snapshot()
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring data snapshot for campus {tenant}: {e}")
+    evicted = []
+    with _tenants_lock:
+        _tenants[tenant] = data_dir
+        while len(_tenants) > current_app.config['TENANT_CACHE_SIZE']:
+            evicted.append(_tenants.popitem(last=False)[1])
+    for old_dir in evicted:
+        evict_tenant_caches(old_dir)
+        TENANT_EVICTIONS.inc()
+    return data_dir
+
+def resolve_tenant():
+    """Serve the request from its campus's data directory"""
+    if request.endpoint in TENANT_EXEMPT_ENDPOINTS:
+        return None
+    if current_app.config['TENANT_ROUTING'] == 'path':
+        tenant = request.environ.get('app.tenant', '')
+    else:
+        tenant = request.host.split(':')[0].split('.')[0].lower()
+    data_dir = activate_tenant(tenant) if TENANT_NAME.match(tenant) else None
+    if not data_dir:
+        return jsonify({'error': 'Unknown campus'}), 404
+    g.tenant = tenant
+    g.data_dir = data_dir
+    # Browsers share one session cookie across path-routed campuses, so a
+    # session only counts on the campus it signed in to
+    if 'user' in session and session.get('tenant') != tenant:
+        session.pop('user')
+
+# Snapshots of all stores (see snapshot.py) let a worker skip parsing the
+# JSON files at startup: entries that still match the file on disk seed the
+# store cache directly.
+SNAPSHOT_STORES = ('students', 'users', 'attendance', 'face_data')
+
+def snapshot_file():
+    """Get the snapshot file path, or None if snapshots are disabled"""
+    name = current_app.config['SNAPSHOT_FILE'] if has_app_context() else DEFAULT_CONFIG['SNAPSHOT_FILE']
+    return os.path.join(get_data_dir(), name) if name else None
+
+def write_data_snapshot(path=None, compress=False):
+    """Write all existing stores to a snapshot file and return how many were written"""
+    path = path or snapshot_file()
+    stores = {}
+    # Under the write lock so the stores are captured at one point in time
+    with store_write_lock():
+        for store in SNAPSHOT_STORES:
+            if read_store(store) is None:
+                continue
+            with _store_cache_lock:
+                entry = _store_cache[store_file(store)]
+            stores[store] = {'stamp': list(entry['stamp']), 'digest': entry['digest'], 'data': entry['data']}
+    snapshot.write_snapshot(path, stores, compress)
+    return len(stores)
+
+def load_data_snapshot(path=None):
+    """Seed the store cache from a snapshot and return the stores that were still current"""
+    path = path or snapshot_file()
+    if not path or not os.path.exists(path):
+        return []
+    loaded = []
+    for store, entry in snapshot.read_snapshot(path)['stores'].items():
+        if store not in STORE_FILES:
+            continue
+        store_path = store_file(store)
+        stamp = file_stamp(store_path)
+        if stamp is None:
+            continue
+        if stamp != tuple(entry['stamp']):
+            # Copied or redeployed files keep their content but not their mtime
+            if stamp[1] != entry['stamp'][1]:
+                continue
+            with open(store_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != entry['digest']:
+                    continue
+        with _store_cache_lock:
+            _store_cache[store_path] = {'stamp': stamp, 'digest': entry['digest'], 'data': entry['data']}
+        loaded.append(store)
+    return loaded
+
+def restore_data_snapshot(path):
+    """Rewrite the JSON stores from a snapshot and return how many were restored"""
+    savers = {'students': save_students, 'users': save_users, 'attendance': save_attendance, 'face_data': save_face_data}
+    stores = snapshot.read_snapshot(path)['stores']
+    restored = 0
+    # Writers wait until every store is restored, so none sees a mix of both
+    with store_write_lock():
+        for store, entry in stores.items():
+            if store not in savers:
+                # e.g. a snapshot written by a newer version with more stores
+                logging.warning(f"Skipping unknown store {store!r} in snapshot {path}")
+                continue
+            savers[store](marshal.loads(entry['data']))
+            restored += 1
+        reset_change_feed()
+    if snapshot_file():
+        write_data_snapshot()
+    return restored
+
+def get_backup_dir():
+    """Get the backup directory of the current data directory"""
+    name = current_app.config['BACKUP_DIR'] if has_app_context() else DEFAULT_CONFIG['BACKUP_DIR']
+    return os.path.join(get_data_dir(), name)
+
+def create_backup(backup_dir=None):
+    """Back up all stores as of one point in time and return (backup id, manifest)
+
+    Writers are only held off while the store files are hard-linked into a
+    staging directory; hashing and compression (see backup.py) happen after
+    the lock is released. Store files are replaced, never modified in place,
+    so the links keep pointing at the captured versions.
+    """
+    staging_dir = tempfile.mkdtemp(prefix='.backup-', dir=get_data_dir() or '.')
+    try:
+        files = {}
+        with store_write_lock():
+            for store in SNAPSHOT_STORES:
+                path = store_file(store)
+                if not os.path.exists(path):
+                    continue
+                files[store] = os.path.join(staging_dir, STORE_FILES[store])
+                try:
+                    os.link(path, files[store])
+                except OSError:
+                    shutil.copyfile(path, files[store])  # no hard links on this filesystem
+        return backup.write_backup(backup_dir or get_backup_dir(), files)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+def restore_backup(backup_id, backup_dir=None):
+    """Rewrite the JSON stores from a backup and return how many were restored"""
+    savers = {'students': save_students, 'users': save_users, 'attendance': save_attendance, 'face_data': save_face_data}
+    contents = backup.read_backup(backup_dir or get_backup_dir(), backup_id)
+    with store_write_lock():
+        for store, raw in contents.items():
+            savers[store](json.loads(raw))
+        reset_change_feed()
+    if snapshot_file():
+        write_data_snapshot()
+    return len(contents)
+
+def start_backup_scheduler(app):
+    """Take a backup every BACKUP_INTERVAL seconds, keeping the newest BACKUP_KEEP"""
+    interval = app.config['BACKUP_INTERVAL']
+    if not interval:
+        return
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    backup_id, manifest = create_backup()
+                    backup.prune_backups(get_backup_dir(), app.config['BACKUP_KEEP'])
+                logging.info(f"Backup {backup_id}: {len(manifest['stores'])} stores")
+            except Exception:
+                logging.exception('Failed to write backup')
+    
+    threading.Thread(target=run, name='backup-scheduler', daemon=True).start()
+
+def start_snapshot_writer(app):
+    """Write a snapshot every SNAPSHOT_INTERVAL seconds when data changed, and on shutdown"""
+    interval = app.config['SNAPSHOT_INTERVAL']
+    if not interval or not app.config['SNAPSHOT_FILE']:
+        return
+    last_revisions = [None]
+    
+    def write_if_changed():
+        with app.app_context():
+            revisions = tuple(get_revision(store) for store in SNAPSHOT_STORES)
+            if revisions != last_revisions[0]:
+                write_data_snapshot()
+                last_revisions[0] = revisions
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                write_if_changed()
+            except Exception:
+                logging.exception('Failed to write data snapshot')
+    
+    threading.Thread(target=run, name='snapshot-writer', daemon=True).start()
+    atexit.register(write_if_changed)
+
+# Stored responses for POSTs carrying an Idempotency-Key header. They are kept
+# in the shared backend when one is configured, so a retry that lands on
+# another worker is replayed too; otherwise each process keeps its own.
+IDEMPOTENCY_TTL = 24 * 60 * 60  # seconds
+IDEMPOTENCY_MAX_KEYS = 10000
+_idempotency_cache = OrderedDict()
+_idempotency_lock = threading.Lock()
+
+# Admission control for image endpoints. At most IMAGE_MAX_IN_FLIGHT image
+# requests run at once per process and up to IMAGE_MAX_QUEUE more may wait
+# IMAGE_QUEUE_TIMEOUT seconds for a slot; the rest are shed with a 503 so
+# lightweight endpoints keep their worker threads. A waiting request holds
+# its thread too, so when the WORKER_THREADS config is set both limits are
+# cut until IMAGE_RESERVED_THREADS threads stay free for other endpoints.
+IMAGE_MAX_IN_FLIGHT = int(os.environ.get('IMAGE_MAX_IN_FLIGHT', 4))
+IMAGE_MAX_QUEUE = int(os.environ.get('IMAGE_MAX_QUEUE', 8))
+IMAGE_QUEUE_TIMEOUT = float(os.environ.get('IMAGE_QUEUE_TIMEOUT', 2.0))
+IMAGE_RESERVED_THREADS = int(os.environ.get('IMAGE_RESERVED_THREADS', 2))
+IMAGE_RETRY_AFTER = 2  # seconds
+_admission_stats = {'in_flight': 0, 'queued': 0, 'admitted': 0, 'shed_queue_full': 0, 'shed_timeout': 0}
+_admission_cond = threading.Condition()
 
 def generate_roll_number():
     """Generate a unique roll number"""
@@ -109,15 +1054,15 @@ def generate_roll_number():
     logging.info(f"Total students loaded: {len(students)}")
     
     if not students:
-        logging.info("No students found, returning 2024001")
-        return "2024001"
+        logging.info(f"No students found, returning {ROLL_PREFIX}001")
+        return f"{ROLL_PREFIX}001"
     
     # Get all existing roll numbers
     existing_rolls = []
     for student in students:
         try:
             if 'roll_number' in student and student['roll_number']:
-                roll_num = int(student['roll_number'][3:])
+                roll_num = int(student['roll_number'][len(ROLL_PREFIX):])
                 existing_rolls.append(roll_num)
                 logging.info(f"Found roll number: {student['roll_number']} -> {roll_num}")
         except (ValueError, KeyError, IndexError) as e:
@@ -127,8 +1072,8 @@ def generate_roll_number():
     logging.info(f"All existing roll numbers: {existing_rolls}")
     
     if not existing_rolls:
-        logging.info("No valid roll numbers found, returning 2024001")
-        return "2024001"
+        logging.info(f"No valid roll numbers found, returning {ROLL_PREFIX}001")
+        return f"{ROLL_PREFIX}001"
     
     # Find the first gap or use the next number after the highest
     existing_rolls = sorted(existing_rolls)
@@ -145,7 +1090,7 @@ def generate_roll_number():
     if next_roll > 999:
         raise ValueError("Maximum number of students (999) reached")
     
-    result = f"2024{next_roll:03d}"
+    result = f"{ROLL_PREFIX}{next_roll:03d}"
     logging.info(f"Final generated roll number: {result}")
     return result
 
@@ -171,9 +1116,315 @@ def require_role(role):
         return decorated_function
     return decorator
 
+def _shed_response():
+    response = jsonify({'error': 'Server is busy, please try again in a moment'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(IMAGE_RETRY_AFTER)
+    return response
+
+def admission_limits():
+    """Return (max in flight, max queued) for image requests in this worker"""
+    threads = current_app.config['WORKER_THREADS']
+    if not threads:
+        return IMAGE_MAX_IN_FLIGHT, IMAGE_MAX_QUEUE
+    # With a single thread (e.g. sync workers) there is nothing to reserve
+    available = max(1, threads - IMAGE_RESERVED_THREADS)
+    max_in_flight = min(IMAGE_MAX_IN_FLIGHT, available)
+    return max_in_flight, min(IMAGE_MAX_QUEUE, available - max_in_flight)
+
+def image_admission(f):
+    """Decorator to bound concurrent image processing, shedding excess load with 503"""
+    def decorated_function(*args, **kwargs):
+        max_in_flight, max_queue = admission_limits()
+        with _admission_cond:
+            if _admission_stats['in_flight'] >= max_in_flight:
+                if _admission_stats['queued'] >= max_queue:
+                    _admission_stats['shed_queue_full'] += 1
+                    return _shed_response()
+                _admission_stats['queued'] += 1
+                deadline = time.monotonic() + IMAGE_QUEUE_TIMEOUT
+                try:
+                    while _admission_stats['in_flight'] >= max_in_flight:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            _admission_stats['shed_timeout'] += 1
+                            return _shed_response()
+                        _admission_cond.wait(remaining)
+                finally:
+                    _admission_stats['queued'] -= 1
+            _admission_stats['in_flight'] += 1
+            _admission_stats['admitted'] += 1
+        try:
+            return f(*args, **kwargs)
+        finally:
+            with _admission_cond:
+                _admission_stats['in_flight'] -= 1
+                _admission_cond.notify()
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def conditional(*stores):
+    """Decorator to answer If-None-Match with 304 when the given stores are unchanged"""
+    def decorator(f):
+        def decorated_function(*args, **kwargs):
+            # Tags depend only on the content of the stores, never on
+            # per-process revision counters, so every worker agrees on them
+            parts = [g.get('tenant', ''), request.full_path, session.get('user', {}).get('username', ''), date.today().isoformat()]
+            for store in stores:
+                parts.append(f"{store}:{store_digest(store)}")
+            etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+            # Compressed representations carry an encoding suffix on the tag
+            matched = next((etag + suffix for suffix in ('', '-gzip', '-br')
+                            if etag + suffix in request.if_none_match), None)
+            if matched:
+                response = current_app.response_class(status=304)
+                response.set_etag(matched)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            else:
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        decorated_function.__name__ = f.__name__
+        return decorated_function
+    return decorator
+
+def load_idempotent_response(cache_key):
+    """Get the stored (body, status) for an idempotency key, or None"""
+    if _shared_backend is not None:
+        try:
+            stored = _shared_backend.get(shared_state.IDEMPOTENCY_PREFIX + json.dumps(cache_key))
+            if stored is None:
+                return None
+            stored = json.loads(stored)
+            return stored['body'], stored['status']
+        except Exception as e:
+            logging.warning(f"Could not read idempotency key: {e}")
+            return None
+    now = time.monotonic()
+    with _idempotency_lock:
+        cached = _idempotency_cache.get(cache_key)
+        if cached and cached[0] <= now:
+            del _idempotency_cache[cache_key]
+            cached = None
+    return cached[1:] if cached else None
+
+def store_idempotent_response(cache_key, body, status):
+    """Keep a successful response for replay when the same key is retried"""
+    if _shared_backend is not None:
+        try:
+            _shared_backend.set(shared_state.IDEMPOTENCY_PREFIX + json.dumps(cache_key),
+                                json.dumps({'body': body, 'status': status}), ex=IDEMPOTENCY_TTL)
+        except Exception as e:
+            logging.warning(f"Could not store idempotency key: {e}")
+        return
+    with _idempotency_lock:
+        _idempotency_cache[cache_key] = (time.monotonic() + IDEMPOTENCY_TTL, body, status)
+        while len(_idempotency_cache) > IDEMPOTENCY_MAX_KEYS:
+            _idempotency_cache.popitem(last=False)
+
+def idempotent(f):
+    """Decorator to replay the stored response when a client retries with the same Idempotency-Key"""
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key or 'user' not in session:
+            return f(*args, **kwargs)
+        cache_key = (g.get('tenant', ''), f.__name__, session['user']['username'], key)
+        cached = load_idempotent_response(cache_key)
+        if cached:
+            response = jsonify(cached[0])
+            response.status_code = cached[1]
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+        response = current_app.make_response(f(*args, **kwargs))
+        # Only successful responses are stored so failed attempts can be retried
+        if 200 <= response.status_code < 300:
+            store_idempotent_response(cache_key, response.get_json(), response.status_code)
+        return response
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def write_locked(f):
+    """Decorator to run a view under the store write lock, so its load-modify-save and change records are one critical section"""
+    def decorated_function(*args, **kwargs):
+        with store_write_lock():
+            return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+@bp.before_app_request
+def start_request_timer():
+    """Record when the request started for the latency histogram"""
+    g.request_started = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+
+@bp.after_app_request
+def record_request_metrics(response):
+    """Observe request latency and count the status code per route"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Label by URL rule, not path, to keep the number of series bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_LATENCY.observe(request.method, route, value=time.perf_counter() - started)
+        REQUEST_COUNT.inc(request.method, route, response.status_code)
+        REQUESTS_IN_FLIGHT.dec()
+    return response
+
+@bp.teardown_app_request
+def finish_request_timer(exc):
+    """Release the in-flight slot of a request that never produced a response"""
+    if g.pop('request_started', None) is not None:
+        REQUESTS_IN_FLIGHT.dec()
+
+def is_trusted_client():
+    """Whether the request comes from a signed-in principal, or from localhost if TRUST_LOCALHOST is set"""
+    # Behind a reverse proxy on the same host every client is localhost, so
+    # this is opt-in (with ProxyFix applied, remote_addr is the real client)
+    if current_app.config['TRUST_LOCALHOST'] and request.remote_addr in ('127.0.0.1', '::1'):
+        return True
+    return session.get('user', {}).get('role') == 'principal'
+
+# Opt-in request profiling. create_app() only installs these hooks when
+# PROFILE_DIR is set. A request is profiled when a trusted client sends
+# X-Profile: 1 or it is picked by PROFILE_SAMPLE_RATE. tracemalloc traces the
+# whole process, so one request is profiled at a time and others overlapping
+# it run normally.
+PROFILE_TOP_FUNCTIONS = 40
+PROFILE_TOP_ALLOCATIONS = 25
+PROFILE_MAX_LIST = 50
+_profile_lock = threading.Lock()
+
+def start_request_profile():
+    """Start cProfile and tracemalloc for a request picked for profiling"""
+    wanted = request.headers.get('X-Profile') == '1' and is_trusted_client()
+    if not wanted and random.random() >= current_app.config['PROFILE_SAMPLE_RATE']:
+        return
+    if not _profile_lock.acquire(blocking=False):
+        return
+    import cProfile
+    import tracemalloc
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    g.request_profile = (profiler, time.perf_counter())
+    profiler.enable()
+
+def finish_request_profile(exc):
+    """Stop profiling and write the profile and allocation report"""
+    started = g.pop('request_profile', None)
+    if started is None:
+        return
+    import pstats
+    import tracemalloc
+    profiler, started_at = started
+    try:
+        profiler.disable()
+        elapsed = time.perf_counter() - started_at
+        allocations = tracemalloc.take_snapshot().statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        route_dir = os.path.join(current_app.config['PROFILE_DIR'], re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root')
+        os.makedirs(route_dir, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{request.method}"
+        profiler.dump_stats(os.path.join(route_dir, name + '.prof'))
+        with open(os.path.join(route_dir, name + '.txt'), 'w') as f:
+            f.write(f"{request.method} {request.full_path}\n")
+            f.write(f"Route: {route}\nElapsed: {elapsed * 1000:.1f} ms\nPeak traced memory: {peak / 1024:.1f} KiB\n")
+            if exc is not None:
+                f.write(f"Exception: {exc!r}\n")
+            f.write(f"\nTop {PROFILE_TOP_FUNCTIONS} functions by cumulative time\n")
+            pstats.Stats(profiler, stream=f).sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+            f.write(f"Top {PROFILE_TOP_ALLOCATIONS} allocation sites\n")
+            for stat in allocations:
+                f.write(f"{stat}\n")
+        logging.info(f"Profiled {request.method} {route} in {elapsed * 1000:.1f} ms: {route_dir}/{name}")
+    except Exception:
+        logging.exception('Failed to write request profile')
+    finally:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        _profile_lock.release()
+
+def list_request_profiles(profile_dir, limit=PROFILE_MAX_LIST):
+    """List the most recent profiles under profile_dir, newest first"""
+    profiles = []
+    if not os.path.isdir(profile_dir):
+        return profiles
+    for route_dir in os.scandir(profile_dir):
+        if not route_dir.is_dir():
+            continue
+        for entry in os.scandir(route_dir.path):
+            if entry.name.endswith('.prof'):
+                name = entry.name[:-len('.prof')]
+                profiles.append({
+                    'route': route_dir.name,
+                    'name': name,
+                    'created': datetime.fromtimestamp(entry.stat().st_mtime).isoformat(),
+                    'profile': f"{route_dir.name}/{entry.name}",
+                    'report': f"{route_dir.name}/{name}.txt"
+                })
+    profiles.sort(key=lambda p: p['created'], reverse=True)
+    return profiles[:limit]
+
+# Response compression for large JSON bodies. Levels favour latency over
+# ratio; compressed bodies of ETagged responses are cached by tag, which
+# already encodes the data revisions the body was built from.
+COMPRESS_MIN_SIZE = 1024  # bytes
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+COMPRESS_CACHE_SIZE = 256
+_compress_cache = OrderedDict()
+_compress_cache_lock = threading.Lock()
+
+def compress_body(body, encoding):
+    """Compress a response body with gzip or br"""
+    if encoding == 'br':
+        return get_brotli().compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+@bp.after_app_request
+def compress_response(response):
+    """Compress JSON responses when the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    offered = ['br', 'gzip'] if get_brotli() else ['gzip']
+    encoding = request.accept_encodings.best_match(offered)
+    if not encoding:
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    etag = response.get_etag()[0]
+    cache_key = (etag, encoding)
+    compressed = None
+    if etag:
+        with _compress_cache_lock:
+            compressed = _compress_cache.get(cache_key)
+            if compressed is not None:
+                _compress_cache.move_to_end(cache_key)
+    if compressed is None:
+        compressed = compress_body(body, encoding)
+        if etag:
+            with _compress_cache_lock:
+                _compress_cache[cache_key] = compressed
+                while len(_compress_cache) > COMPRESS_CACHE_SIZE:
+                    _compress_cache.popitem(last=False)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}")
+    return response
+
 # Helper to log CRUD actions
 def log_crud_action(action, user, details=None):
     msg = f"{action} by {user['username']} ({user['role']})"
+    if has_app_context() and g.get('tenant'):
+        msg = f"[{g.tenant}] {msg}"
     if details:
         msg += f" | {details}"
     logging.info(msg)
@@ -198,27 +1449,162 @@ def resolve_username_to_name(username):
         return user.get('name', username)
     return username
 
+def filter_students(students, query):
+    """Get students whose name or roll number contains the lowercase query"""
+    return [
+        student for student in students
+        if query in student['name'].lower() or query in student['roll_number'].lower()
+    ]
+
 def get_student_by_roll_number(roll_number):
     """Get student by roll number"""
     students = load_students()
     return next((s for s in students if s['roll_number'] == roll_number), None)
 
-def mark_attendance(student_id, status='present'):
-    """Mark attendance for a student"""
-    attendance = load_attendance()
+# Live class attendance boards. Each open /stream connection subscribes to
+# its (data directory, class) key and receives the attendance events
+# published by this process; writes made by other workers are not seen.
+# A subscriber that falls BOARD_QUEUE_SIZE events behind is sent a fresh
+# snapshot instead.
+BOARD_QUEUE_SIZE = 256
+BOARD_KEEPALIVE = 15  # seconds between comments on an idle stream
+_board_subscribers = {}
+_board_lock = threading.Lock()
+
+def subscribe_class_board(class_name):
+    """Register a subscriber for a class's attendance events and return it"""
+    subscriber = {'key': (get_data_dir(), class_name), 'queue': queue.Queue(BOARD_QUEUE_SIZE), 'resync': False}
+    with _board_lock:
+        _board_subscribers.setdefault(subscriber['key'], []).append(subscriber)
+    return subscriber
+
+def unsubscribe_class_board(subscriber):
+    with _board_lock:
+        subscribers = _board_subscribers.get(subscriber['key'], [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers:
+            _board_subscribers.pop(subscriber['key'], None)
+
+def publish_attendance_event(student_id, event, data):
+    """Send an attendance event to the boards watching the student's class"""
+    data_dir = get_data_dir()
+    with _board_lock:
+        if not any(key[0] == data_dir for key in _board_subscribers):
+            return
+    student = get_student_views()['by_id'].get(student_id)
+    if not student:
+        return
+    with _board_lock:
+        subscribers = list(_board_subscribers.get((data_dir, student['class']), []))
+    for subscriber in subscribers:
+        try:
+            subscriber['queue'].put_nowait((event, data))
+        except queue.Full:
+            subscriber['resync'] = True
+
+def build_class_attendance(class_name):
+    """Get today's attendance status for every student in a class"""
+    entry = get_student_views()
+    class_students = students_in_order(entry, entry['by_class'].get(class_name, set()))
+    
+    today_records = get_today_attendance()
     today = date.today().isoformat()
     
-    if today not in attendance:
-        attendance[today] = {}
+    class_attendance = []
+    for student in class_students:
+        student_attendance = {
+            'student': student,
+            'today_status': 'absent'
+        }
+        
+        record = today_records.get(str(student['id']))
+        if record:
+            student_attendance['today_status'] = record['status']
+            student_attendance['timestamp'] = record['timestamp']
+        
+        class_attendance.append(student_attendance)
     
-    attendance[today][str(student_id)] = {
-        'status': status,
-        'timestamp': datetime.now().isoformat(),
-        'method': 'face_recognition'
+    return {
+        'class': class_name,
+        'date': today,
+        'attendance': class_attendance
+    }
+
+def format_sse(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Group commit for attendance marks. Marks arriving within
+# ATTENDANCE_COMMIT_WINDOW of each other are applied with a single
+# load-modify-save of attendance.json, and every request in the batch
+# returns only after that write has been fsynced. The first mark to arrive
+# while no commit is running leads the batch; marks arriving during a
+# commit form the next one. Batches are per data directory (campus).
+ATTENDANCE_COMMIT_WINDOW = float(os.environ.get('ATTENDANCE_COMMIT_WINDOW', 0.02))  # seconds
+ATTENDANCE_MAX_BATCH = 500
+_attendance_batches = {}
+_attendance_cond = threading.Condition()
+
+def _commit_pending_attendance(state):
+    """Lead one group commit of the pending marks in state"""
+    if ATTENDANCE_COMMIT_WINDOW:
+        time.sleep(ATTENDANCE_COMMIT_WINDOW)
+    with _attendance_cond:
+        batch = state['pending'][:ATTENDANCE_MAX_BATCH]
+        del state['pending'][:ATTENDANCE_MAX_BATCH]
+    error = None
+    try:
+        # The write lock makes the load-modify-save atomic across workers
+        with store_write_lock():
+            attendance = load_attendance()
+            for entry in batch:
+                attendance.setdefault(entry['date'], {})[str(entry['student_id'])] = entry['record']
+            save_attendance(attendance)
+            record_changes('attendance', [{'op': 'upsert', 'id': entry['student_id'], 'date': entry['date'],
+                                           'data': entry['record']} for entry in batch])
+        ATTENDANCE_COMMITS.inc()
+        ATTENDANCE_MARKS_COMMITTED.inc(amount=len(batch))
+    except Exception as e:
+        error = e
+    with _attendance_cond:
+        for entry in batch:
+            entry['done'] = True
+            entry['error'] = error
+        state['committing'] = False
+        _attendance_cond.notify_all()
+
+def mark_attendance(student_id, status='present'):
+    """Mark attendance for a student, returning once the mark is durably written"""
+    today = date.today().isoformat()
+    entry = {
+        'student_id': student_id,
+        'date': today,
+        'record': {
+            'status': status,
+            'timestamp': datetime.now().isoformat(),
+            'method': 'face_recognition'
+        },
+        'done': False,
+        'error': None
     }
     
-    save_attendance(attendance)
-    return attendance[today][str(student_id)]
+    with _attendance_cond:
+        state = _attendance_batches.setdefault(get_data_dir(), {'pending': [], 'committing': False})
+        state['pending'].append(entry)
+    while True:
+        with _attendance_cond:
+            while state['committing'] and not entry['done']:
+                _attendance_cond.wait()
+            if entry['done']:
+                break
+            state['committing'] = True
+        _commit_pending_attendance(state)
+    if entry['error']:
+        raise entry['error']
+    
+    publish_attendance_event(student_id, 'attendance', dict(entry['record'], student_id=student_id, date=today))
+    return entry['record']
 
 def get_attendance_for_student(student_id, start_date=None, end_date=None):
     """Get attendance records for a specific student"""
@@ -241,16 +1627,28 @@ def detect_faces(image_array):
     # In a real deployment, you would use a cloud-based face detection service
     return True, 1
 
+# Bump when the embedding computation changes so stored data can be re-embedded
+FACE_EMBEDDING_MODEL = 'gray16-v1'
+
+def compute_face_embedding(image):
+    """Compute a normalized 16x16 grayscale embedding for a PIL image"""
+    pixels = list(image.convert('L').resize((16, 16)).getdata())
+    mean = sum(pixels) / len(pixels)
+    centered = [p - mean for p in pixels]
+    norm = sum(c * c for c in centered) ** 0.5 or 1.0
+    return [round(c / norm, 6) for c in centered]
+
 def verify_face(image_data, student_roll_number):
     """Verify face using simplified detection for Vercel"""
     try:
+        from PIL import Image
+        
         # Decode base64 image
         image_bytes = base64.b64decode(image_data.split(',')[1])
         image = Image.open(io.BytesIO(image_bytes))
         
-        # Load face data
-        face_data = load_face_data()
-        if student_roll_number not in face_data:
+        # Check enrollment from the cache
+        if student_roll_number not in get_face_registry():
             return False, "No face data registered for this student. Please register your face first."
         
         # For Vercel deployment, we'll just verify that an image was provided
@@ -261,20 +1659,26 @@ def verify_face(image_data, student_roll_number):
         return False, f"Error during face verification: {str(e)}"
 
 def register_face(image_data, student_roll_number):
-    """Register face data for a student (simplified for Vercel)"""
+    """Register face data for a student from one frame or a list of frames (simplified for Vercel)"""
+    frames = image_data if isinstance(image_data, list) else [image_data]
     try:
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data.split(',')[1])
-        image = Image.open(io.BytesIO(image_bytes))
+        from PIL import Image
         
-        # Store face data (simplified for Vercel deployment)
-        face_data = load_face_data()
-        face_data[student_roll_number] = {
-            'registered_at': datetime.now().isoformat(),
-            'face_detected': True
-        }
+        # Decode base64 images
+        for frame in frames:
+            image_bytes = base64.b64decode(frame.split(',')[1])
+            image = Image.open(io.BytesIO(image_bytes))
         
-        save_face_data(face_data)
+        # Store face data (simplified for Vercel deployment). Load-modify-save
+        # under the store write lock, shared with every other worker
+        with store_write_lock():
+            face_data = load_face_data()
+            face_data[student_roll_number] = {
+                'registered_at': datetime.now().isoformat(),
+                'face_detected': True,
+                'frames': len(frames)
+            }
+            save_face_data(face_data)
         return True, "Face registered successfully (simplified for Vercel deployment). Please login again to mark attendance."
         
     except Exception as e:
@@ -282,22 +1686,229 @@ def register_face(image_data, student_roll_number):
 
 def check_face_registered(student_roll_number):
     """Check if a student has registered their face"""
-    face_data = load_face_data()
-    return student_roll_number in face_data
+    return student_roll_number in get_face_registry()
+
+# Fingerprinted static assets. On first use every file in the static folder
+# is content-hashed and precompressed in memory; url_for('static', ...) then
+# emits the hashed name so browsers can cache it forever. In debug mode the
+# folder is re-stat'ed on use and only files whose stamp changed are rebuilt.
+STATIC_HASH_LENGTH = 10
+STATIC_COMPRESS_TYPES = ('text/css', 'text/javascript', 'application/javascript', 'image/svg+xml')
+_static_manifests = {}
+_static_manifest_lock = threading.Lock()
+
+def scan_static_folder():
+    """Map each file in the static folder, relative to it, to its (path, stamp)"""
+    found = {}
+    for root, _, filenames in os.walk(current_app.static_folder):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            source = os.path.relpath(path, current_app.static_folder).replace(os.sep, '/')
+            found[source] = (path, file_stamp(path))
+    return found
+
+def build_static_manifest(previous=None):
+    """Hash and precompress the static folder, returning the asset manifest
+
+    Assets of files unchanged since the previous manifest are reused, and
+    the previous manifest itself is returned if nothing changed.
+    """
+    found = scan_static_folder()
+    stamps = {source: stamp for source, (_, stamp) in found.items()}
+    if previous and previous['stamps'] == stamps:
+        return previous
+    files, assets = {}, {}
+    for source, (path, stamp) in found.items():
+        if previous and previous['stamps'].get(source) == stamp:
+            files[source] = previous['files'][source]
+            assets[files[source]] = previous['assets'][files[source]]
+            continue
+        with open(path, 'rb') as f:
+            body = f.read()
+        digest = hashlib.sha256(body).hexdigest()[:STATIC_HASH_LENGTH]
+        stem, ext = os.path.splitext(source)
+        hashed = f"{stem}.{digest}{ext}"
+        mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+        asset = {'body': body, 'mimetype': mimetype, 'digest': digest}
+        if mimetype in STATIC_COMPRESS_TYPES:
+            asset['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if get_brotli():
+                asset['br'] = get_brotli().compress(body, quality=11)
+        files[source] = hashed
+        assets[hashed] = asset
+    return {'files': files, 'assets': assets, 'stamps': stamps}
+
+def get_static_manifest():
+    """Get the static asset manifest, refreshing changed files in debug mode"""
+    with _static_manifest_lock:
+        manifest = _static_manifests.get(current_app.static_folder)
+        if manifest is None or current_app.debug:
+            manifest = build_static_manifest(manifest)
+            _static_manifests[current_app.static_folder] = manifest
+        return manifest
+
+@bp.app_url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Point url_for('static', filename=...) at the content-hashed asset"""
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = get_static_manifest()['files'].get(values['filename'], values['filename'])
+
+def serve_static(filename):
+    """Serve hashed assets from memory with immutable caching, anything else from disk"""
+    asset = get_static_manifest()['assets'].get(filename)
+    if not asset:
+        return current_app.send_static_file(filename)
+    encoding = request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in asset])
+    response = current_app.response_class(asset[encoding] if encoding else asset['body'], mimetype=asset['mimetype'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{asset['digest']}-{encoding}" if encoding else asset['digest'])
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response.make_conditional(request)
+
+# Face enrollment jobs. Frames are processed by a small in-process worker pool
+# so the request returns immediately; job state is persisted to
+# enrollment_jobs.json, written like the other stores (atomically, with
+# load-modify-save under the store write lock), so any worker can answer
+# status polls. A job whose worker went away is reported as failed: this
+# process knows its own jobs, and jobs of other workers, possibly on other
+# hosts, count as lost once ENROLLMENT_JOB_TIMEOUT has passed.
+ENROLLMENT_WORKERS = int(os.environ.get('ENROLLMENT_WORKERS', 2))
+ENROLLMENT_MAX_FRAMES = 10
+ENROLLMENT_MAX_JOBS = 500  # finished jobs kept in the jobs file
+ENROLLMENT_MAX_WAIT = 30  # seconds a status poll may block
+ENROLLMENT_JOB_TIMEOUT = int(os.environ.get('ENROLLMENT_JOB_TIMEOUT', 300))  # seconds
+_enrollment_executor = None
+_enrollment_cond = threading.Condition()
+_active_enrollment_jobs = set()  # IDs of jobs queued or running in this process
+
+def load_enrollment_jobs():
+    """Load enrollment jobs from JSON file"""
+    jobs = read_store('enrollment_jobs')
+    return jobs if jobs is not None else {}
+
+def save_enrollment_jobs(jobs):
+    """Save enrollment jobs to JSON file, dropping the oldest finished jobs"""
+    finished = sorted((j for j in jobs.values() if j['status'] in ('succeeded', 'failed')),
+                      key=lambda j: j['created_at'])
+    for job in finished[:max(0, len(finished) - ENROLLMENT_MAX_JOBS)]:
+        del jobs[job['id']]
+    write_store('enrollment_jobs', jobs)
+
+def _enrollment_job_lost(job):
+    """Whether an unfinished job no longer has a worker processing it"""
+    if job['status'] not in ('queued', 'running'):
+        return False
+    if job.get('node') == NODE_ID:
+        with _enrollment_cond:
+            return job['id'] not in _active_enrollment_jobs
+    started = datetime.fromisoformat(job['started_at'] or job['created_at'])
+    return (datetime.now() - started).total_seconds() > ENROLLMENT_JOB_TIMEOUT
+
+def get_enrollment_job(job_id):
+    """Get an enrollment job, marking it failed if its worker has gone away"""
+    job = load_enrollment_jobs().get(job_id)
+    if job and _enrollment_job_lost(job):
+        with store_write_lock():
+            jobs = load_enrollment_jobs()
+            job = jobs.get(job_id)
+            if job and _enrollment_job_lost(job):
+                job.update(status='failed', message='Enrollment was interrupted. Please try again.',
+                           finished_at=datetime.now().isoformat())
+                save_enrollment_jobs(jobs)
+    return job
+
+def _update_enrollment_job(job_id, **fields):
+    with store_write_lock():
+        jobs = load_enrollment_jobs()
+        jobs[job_id].update(fields)
+        save_enrollment_jobs(jobs)
+    with _enrollment_cond:
+        _enrollment_cond.notify_all()
+    return jobs[job_id]
+
+def _run_enrollment_job(app, tenant, data_dir, job_id, frames, student_roll_number, user):
+    try:
+        with app.app_context():
+            g.tenant = tenant
+            g.data_dir = data_dir
+            _process_enrollment_job(job_id, frames, student_roll_number, user)
+    finally:
+        with _enrollment_cond:
+            _active_enrollment_jobs.discard(job_id)
+
+def _process_enrollment_job(job_id, frames, student_roll_number, user):
+    _update_enrollment_job(job_id, status='running', started_at=datetime.now().isoformat())
+    try:
+        success, message = register_face(frames, student_roll_number)
+    except Exception as e:
+        success, message = False, f"Error during face registration: {str(e)}"
+    _update_enrollment_job(job_id, status='succeeded' if success else 'failed', message=message,
+                           finished_at=datetime.now().isoformat())
+    if success:
+        log_crud_action('FACE_REGISTRATION', user, f"Student: {user['name']} registered face ({len(frames)} frames, job {job_id})")
 
-@app.route('/')
+def submit_enrollment_job(frames, student_roll_number, user):
+    """Queue face enrollment for background processing and return the job"""
+    global _enrollment_executor
+    job = {
+        'id': uuid.uuid4().hex,
+        'student_roll_number': student_roll_number,
+        'status': 'queued',
+        'frames': len(frames),
+        'message': None,
+        'created_at': datetime.now().isoformat(),
+        'started_at': None,
+        'finished_at': None,
+        'node': NODE_ID
+    }
+    with _enrollment_cond:
+        _active_enrollment_jobs.add(job['id'])
+        if _enrollment_executor is None:
+            _enrollment_executor = ThreadPoolExecutor(max_workers=ENROLLMENT_WORKERS,
+                                                      thread_name_prefix='enrollment')
+    with store_write_lock():
+        jobs = load_enrollment_jobs()
+        jobs[job['id']] = job
+        save_enrollment_jobs(jobs)
+    _enrollment_executor.submit(_run_enrollment_job, current_app._get_current_object(), g.get('tenant'), get_data_dir(), job['id'], frames, student_roll_number, dict(user))
+    return job
+
+def wait_for_enrollment_job(job_id, timeout):
+    """Block until the job finishes or the timeout expires, then return it"""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = get_enrollment_job(job_id)
+        remaining = deadline - time.monotonic()
+        if not job or job['status'] in ('succeeded', 'failed') or remaining <= 0:
+            return job
+        # Jobs finished by another worker only show up in the file, so re-check periodically
+        with _enrollment_cond:
+            _enrollment_cond.wait(min(remaining, 1.0))
+
+@bp.route('/')
 def index():
     """Serve the main page"""
     if 'user' in session:
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('.dashboard'))
     return render_template('login.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/health')
+def health_check():
+    """Health check endpoint for load balancers and Vercel"""
+    return jsonify({
+        'status': 'healthy',
+        'message': 'School Records API is running',
+        'timestamp': datetime.now().isoformat()
+    })
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Handle login"""
     if request.method == 'GET':
         if 'user' in session:
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('.dashboard'))
         return render_template('login.html')
     
     data = request.get_json()
@@ -313,28 +1924,33 @@ def login():
     if not user or user['password'] != hashlib.sha256(password.encode()).hexdigest():
         return jsonify({'error': 'Invalid username or password'}), 401
     
+    # Server-side sessions get a new ID so one planted before login is useless
+    # afterwards; cookie sessions carry no ID to renew
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
     session['user'] = {
         'username': user['username'],
         'role': user['role'],
         'name': user['name']
     }
+    session['tenant'] = g.get('tenant')
     
     return jsonify({
         'message': 'Login successful',
         'user': session['user']
     })
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     """Handle logout"""
     session.pop('user', None)
     return jsonify({'message': 'Logged out successfully'})
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def dashboard():
     """Serve the dashboard based on user role"""
     if 'user' not in session:
-        return redirect(url_for('login'))
+        return redirect(url_for('.login'))
     
     if session['user']['role'] == 'principal':
         return render_template('principal_dashboard.html')
@@ -345,31 +1961,23 @@ def dashboard():
     else:
         return render_template('teacher_dashboard.html')
 
-@app.route('/api/user')
+@bp.route('/api/user')
 def get_current_user():
     """Get current user information"""
     if 'user' not in session:
         return jsonify({'error': 'Not authenticated'}), 401
     return jsonify(session['user'])
 
-@app.route('/api/students', methods=['GET'])
+@bp.route('/api/students', methods=['GET'])
 @require_auth
+@conditional('students', 'users')
 def get_students():
     """Get all students"""
-    students = load_students()
-    # Add dynamic age calculation and resolve usernames to names
-    for s in students:
-        s['age'] = calculate_age(s['dob']) if 'dob' in s else None
-        # Resolve created_by username to name
-        if 'created_by' in s:
-            s['created_by'] = resolve_username_to_name(s['created_by'])
-        # Resolve updated_by username to name
-        if 'updated_by' in s:
-            s['updated_by'] = resolve_username_to_name(s['updated_by'])
-    return jsonify(students)
+    return jsonify(get_student_views()['views'])
 
-@app.route('/api/students', methods=['POST'])
+@bp.route('/api/students', methods=['POST'])
 @require_auth
+@write_locked
 def add_student():
     """Add a new student"""
     data = request.get_json()
@@ -427,34 +2035,27 @@ def add_student():
     
     students.append(new_student)
     save_students(students)
+    record_change('students', 'upsert', new_id, new_student)
     log_crud_action('CREATE', session['user'], f"Student: {new_student['name']} (ID: {new_student['id']})")
     
     return jsonify(new_student), 201
 
-@app.route('/api/students/<int:student_id>', methods=['GET'])
+@bp.route('/api/students/<int:student_id>', methods=['GET'])
 @require_auth
+@conditional('students', 'users')
 def get_student(student_id):
     """Get a specific student by ID"""
-    students = load_students()
-    student = next((s for s in students if s['id'] == student_id), None)
+    student = get_student_views()['by_id'].get(student_id)
     
     if not student:
         return jsonify({'error': 'Student not found'}), 404
-    # Add dynamic age calculation and resolve usernames to names
-    if 'dob' in student:
-        student['age'] = calculate_age(student['dob'])
-    # Resolve created_by username to name
-    if 'created_by' in student:
-        student['created_by'] = resolve_username_to_name(student['created_by'])
-    # Resolve updated_by username to name
-    if 'updated_by' in student:
-        student['updated_by'] = resolve_username_to_name(student['updated_by'])
     log_crud_action('READ', session['user'], f"Student: {student['name']} (ID: {student['id']})")
     
     return jsonify(student)
 
-@app.route('/api/students/<int:student_id>', methods=['PUT'])
+@bp.route('/api/students/<int:student_id>', methods=['PUT'])
 @require_auth
+@write_locked
 def update_student(student_id):
     """Update a student"""
     data = request.get_json()
@@ -487,12 +2088,14 @@ def update_student(student_id):
     student['updated_by_role'] = session['user']['role']
     
     save_students(students)
+    record_change('students', 'upsert', student_id, student)
     log_crud_action('UPDATE', session['user'], f"Student: {student['name']} (ID: {student['id']})")
     
     return jsonify(student)
 
-@app.route('/api/students/<int:student_id>', methods=['DELETE'])
+@bp.route('/api/students/<int:student_id>', methods=['DELETE'])
 @require_role('principal')
+@write_locked
 def delete_student(student_id):
     """Delete a student and all associated data - only principals can delete"""
     students = load_students()
@@ -504,8 +2107,10 @@ def delete_student(student_id):
     # Remove the student from students list
     students = [s for s in students if s['id'] != student_id]
     save_students(students)
+    record_change('students', 'delete', student_id)
     
-    # Remove all attendance records for this student
+    # Remove all attendance records for this student (held under the write
+    # lock, see write_locked, so marks committed meanwhile are not lost)
     attendance = load_attendance()
     for date in list(attendance.keys()):
         if str(student_id) in attendance[date]:
@@ -514,42 +2119,109 @@ def delete_student(student_id):
             if not attendance[date]:
                 del attendance[date]
     save_attendance(attendance)
+    record_change('attendance', 'delete', student_id)
     
-    # Remove face registration data for this student
+    # Remove face registration data for this student (keyed by roll number)
     face_data = load_face_data()
-    if str(student_id) in face_data:
-        del face_data[str(student_id)]
+    face_keys = [k for k in (student.get('roll_number'), str(student_id)) if k in face_data]
+    if face_keys:
+        for key in face_keys:
+            del face_data[key]
         save_face_data(face_data)
     
     log_crud_action('DELETE', session['user'], f"Student: {student['name']} (ID: {student['id']}) - Removed all attendance and face data")
     
     return jsonify({'message': 'Student and all associated data deleted successfully'})
 
-@app.route('/api/students/search', methods=['GET'])
+@bp.route('/api/students/search', methods=['GET'])
 @require_auth
+@conditional('students', 'users')
 def search_students():
     """Search students by name or roll number"""
     query = request.args.get('q', '').lower()
     if not query:
         return jsonify([])
     
-    students = load_students()
-    filtered_students = [
-        student for student in students
-        if query in student['name'].lower() or query in student['roll_number'].lower()
-    ]
-    
-    # Resolve usernames to names for search results
-    for student in filtered_students:
-        if 'created_by' in student:
-            student['created_by'] = resolve_username_to_name(student['created_by'])
-        if 'updated_by' in student:
-            student['updated_by'] = resolve_username_to_name(student['updated_by'])
-    
-    return jsonify(filtered_students)
+    return jsonify(filter_students(get_student_views()['views'], query))
 
-@app.route('/api/change_password', methods=['POST'])
+@bp.route('/api/students/query', methods=['GET'])
 @require_auth
+@conditional('students', 'users', 'face_data')
+def query_students_route():
+    """Get students matching combined filters: class, min_age/max_age, dob_from/dob_to,
+    created_by, created_from/created_to and face_enrolled"""
+    args = request.args
+    today = date.today()
+    try:
+        dob_from = date.fromisoformat(args['dob_from']) if args.get('dob_from') else None
+        dob_to = date.fromisoformat(args['dob_to']) if args.get('dob_to') else None
+        created_from = date.fromisoformat(args['created_from']) if args.get('created_from') else None
+        created_to = date.fromisoformat(args['created_to']) if args.get('created_to') else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    try:
+        min_age = int(args['min_age']) if args.get('min_age') else None
+        max_age = int(args['max_age']) if args.get('max_age') else None
+    except ValueError:
+        return jsonify({'error': 'min_age and max_age must be whole numbers'}), 400
+    if any(age is not None and not 0 <= age <= MAX_QUERY_AGE for age in (min_age, max_age)):
+        return jsonify({'error': f"min_age and max_age must be between 0 and {MAX_QUERY_AGE}"}), 400
+    face_enrolled = args.get('face_enrolled')
+    if face_enrolled is not None:
+        if face_enrolled.lower() not in ('true', 'false', '1', '0'):
+            return jsonify({'error': 'face_enrolled must be true or false'}), 400
+        face_enrolled = face_enrolled.lower() in ('true', '1')
+
+    # An age range is a DOB range: age >= n means born on or before this day n years ago
+    if min_age is not None:
+        latest = years_before(today, min_age)
+        dob_to = min(dob_to, latest) if dob_to else latest
+    if max_age is not None:
+        earliest = date.fromordinal(years_before(today, max_age + 1).toordinal() + 1)
+        dob_from = max(dob_from, earliest) if dob_from else earliest
+
+    students = query_students(
+        get_student_views(),
+        class_name=args.get('class') or None,
+        dob_from=dob_from,
+        dob_to=dob_to,
+        created_by=resolve_username_to_name(args['created_by']) if args.get('created_by') else None,
+        created_from=created_from.isoformat() if created_from else None,
+        # created_at is a timestamp, so the day after created_to bounds it
+        created_to=date.fromordinal(created_to.toordinal() + 1).isoformat() if created_to and created_to < date.max else None,
+        face_enrolled=face_enrolled,
+        face_registry=get_face_registry() if face_enrolled is not None else None
+    )
+    return jsonify(students)
+
+@bp.route('/api/changes', methods=['GET'])
+@require_role('teacher')
+@conditional('changes', *CHANGE_FEED_STORES)
+def get_changes():
+    """Get changes to students, attendance and users after ?since=<seq>
+
+    Without since, only the current sequence number is returned: take it
+    before loading the full data, then poll with it. 410 means the feed no
+    longer reaches back to since, and the client has to reload in full.
+    """
+    feed = get_synced_change_feed()
+    since = request.args.get('since')
+    if since is None:
+        return jsonify({'seq': feed['last_seq'], 'changes': []})
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({'error': 'since must be a sequence number'}), 400
+    if since < feed['first_seq'] - 1 or since > feed['last_seq']:
+        return jsonify({'error': 'Change feed does not reach back that far, resync required',
+                        'resync': True, 'seq': feed['last_seq']}), 410
+    changes = feed['changes'][since + 1 - feed['first_seq']:]
+    return jsonify({'seq': feed['last_seq'],
+                    'changes': [{k: v for k, v in change.items() if k != 'stamp'} for change in changes]})
+
+@bp.route('/api/change_password', methods=['POST'])
+@require_auth
+@write_locked
 def change_password():
     data = request.get_json()
     current_password = data.get('current_password')
@@ -581,10 +2253,12 @@ def change_password():
     user['password'] = hashlib.sha256(new_password.encode()).hexdigest()
     users[username] = user
     save_users(users)
+    record_change('users', 'upsert', username, user_change_data(user))
     return jsonify({'message': 'Password changed successfully'})
 
-@app.route('/api/teachers', methods=['GET'])
+@bp.route('/api/teachers', methods=['GET'])
 @require_auth
+@conditional('users')
 def get_teachers():
     # Only principal can access
     if session['user']['role'] != 'principal':
@@ -601,8 +2275,9 @@ def get_teachers():
             })
     return jsonify(teachers)
 
-@app.route('/api/teachers/<username>', methods=['PUT'])
+@bp.route('/api/teachers/<username>', methods=['PUT'])
 @require_role('principal')
+@write_locked
 def update_teacher(username):
     """Update teacher information (name)"""
     data = request.get_json()
@@ -623,6 +2298,7 @@ def update_teacher(username):
     user['name'] = new_name
     users[username] = user
     save_users(users)
+    record_change('users', 'upsert', username, user_change_data(user))
     
     log_crud_action('UPDATE', session['user'], f"Teacher name changed: {old_name} → {new_name} (Username: {username})")
     
@@ -635,32 +2311,36 @@ def update_teacher(username):
         }
     })
 
-@app.route('/teachers_list')
+@bp.route('/teachers_list')
 @require_auth
 def teachers_list_page():
     if session['user']['role'] != 'principal':
         return jsonify({'error': 'Access denied'}), 403
     return render_template('teachers_list.html')
 
-@app.route('/students_list')
+@bp.route('/students_list')
 @require_auth
 def students_list_page():
     return render_template('students_list.html')
 
-@app.route('/master_log')
+@bp.route('/master_log')
 @require_auth
 def master_log():
     # Only principal can access
     if session['user']['role'] != 'principal':
         return jsonify({'error': 'Access denied'}), 403
     log_entries = []
-    if os.path.exists(LOG_FILE):
-        with open(LOG_FILE, 'r') as f:
+    log_file = current_app.config['LOG_FILE']
+    if log_file and os.path.exists(log_file):
+        with open(log_file, 'r') as f:
             log_entries = f.readlines()
+    # The log is shared by every campus; show a campus only its own entries
+    if g.get('tenant'):
+        log_entries = [line for line in log_entries if f"[{g.tenant}] " in line]
     return render_template('master_log.html', logs=log_entries)
 
 # Student Authentication Routes
-@app.route('/student/login', methods=['POST'])
+@bp.route('/student/login', methods=['POST'])
 def student_login():
     """Handle student login with roll number"""
     data = request.get_json()
@@ -674,26 +2354,45 @@ def student_login():
     if not student:
         return jsonify({'error': 'Student not found'}), 404
     
-    # Create student session
+    # Create student session, under a new ID for server-side sessions (see login)
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
     session['user'] = {
         'username': student['roll_number'],
         'role': 'student',
         'name': student['name'],
         'student_id': student['id']
     }
+    session['tenant'] = g.get('tenant')
     
     return jsonify({
         'message': 'Login successful',
         'user': session['user']
     })
 
-@app.route('/api/student/attendance', methods=['POST'])
+@bp.route('/api/student/attendance', methods=['POST'])
 @require_auth
+@idempotent
 def mark_student_attendance():
     """Mark attendance using face recognition"""
     if session['user']['role'] != 'student':
         return jsonify({'error': 'Only students can mark attendance'}), 403
     
+    # Already marked today: return the existing record without touching the image
+    student_id = session['user']['student_id']
+    existing_record = get_today_attendance().get(str(student_id))
+    if existing_record:
+        return jsonify({
+            'message': 'Attendance already marked for today',
+            'attendance': existing_record,
+            'already_marked': True
+        })
+    
+    return _verify_and_mark_attendance(student_id)
+
+@image_admission
+def _verify_and_mark_attendance(student_id):
+    """Verify the uploaded face and mark the student present"""
     data = request.get_json()
     image_data = data.get('image')
     student_roll_number = session['user']['username']
@@ -708,7 +2407,6 @@ def mark_student_attendance():
         return jsonify({'error': message}), 400
     
     # Mark attendance
-    student_id = session['user']['student_id']
     attendance_record = mark_attendance(student_id)
     
     log_crud_action('ATTENDANCE', session['user'], f"Student: {session['user']['name']} marked present")
@@ -718,8 +2416,10 @@ def mark_student_attendance():
         'attendance': attendance_record
     })
 
-@app.route('/api/student/register-face', methods=['POST'])
+@bp.route('/api/student/register-face', methods=['POST'])
 @require_auth
+@idempotent
+@image_admission
 def register_student_face():
     """Register face data for a student"""
     if session['user']['role'] != 'student':
@@ -745,7 +2445,47 @@ def register_student_face():
         'student_roll_number': student_roll_number
     })
 
-@app.route('/api/student/face-status')
+@bp.route('/api/student/face-jobs', methods=['POST'])
+@require_auth
+@idempotent
+def submit_student_face_job():
+    """Submit face frames for background enrollment"""
+    if session['user']['role'] != 'student':
+        return jsonify({'error': 'Only students can register face data'}), 403
+    
+    data = request.get_json()
+    frames = data.get('frames') or ([data['image']] if data.get('image') else [])
+    
+    if not frames or not isinstance(frames, list) or not all(isinstance(f, str) for f in frames):
+        return jsonify({'error': 'At least one image frame is required'}), 400
+    if len(frames) > ENROLLMENT_MAX_FRAMES:
+        return jsonify({'error': f'At most {ENROLLMENT_MAX_FRAMES} frames are allowed'}), 400
+    
+    job = submit_enrollment_job(frames, session['user']['username'], session['user'])
+    
+    return jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'status_url': url_for('.get_student_face_job', job_id=job['id'])
+    }), 202
+
+@bp.route('/api/student/face-jobs/<job_id>')
+@require_auth
+def get_student_face_job(job_id):
+    """Get enrollment job status; pass ?wait=<seconds> to block until it finishes"""
+    try:
+        wait = min(float(request.args.get('wait', 0)), ENROLLMENT_MAX_WAIT)
+    except ValueError:
+        return jsonify({'error': 'wait must be a number of seconds'}), 400
+    
+    job = wait_for_enrollment_job(job_id, wait) if wait > 0 else get_enrollment_job(job_id)
+    
+    if not job or (session['user']['role'] == 'student' and job['student_roll_number'] != session['user']['username']):
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify({k: v for k, v in job.items() if k != 'node'})
+
+@bp.route('/api/student/face-status')
 @require_auth
 def get_student_face_status():
     """Check if student has registered their face"""
@@ -760,8 +2500,9 @@ def get_student_face_status():
         'student_roll_number': student_roll_number
     })
 
-@app.route('/api/student/attendance-history')
+@bp.route('/api/student/attendance-history')
 @require_auth
+@conditional('attendance')
 def get_student_attendance_history():
     """Get attendance history for the logged-in student"""
     if session['user']['role'] != 'student':
@@ -778,8 +2519,9 @@ def get_student_attendance_history():
         'attendance': attendance_records
     })
 
-@app.route('/api/students/<int:student_id>/attendance')
+@bp.route('/api/students/<int:student_id>/attendance')
 @require_role('teacher')
+@conditional('students', 'attendance')
 def get_student_attendance_by_teacher(student_id):
     """Get attendance for a specific student (teacher access)"""
     students = load_students()
@@ -795,40 +2537,135 @@ def get_student_attendance_by_teacher(student_id):
         'attendance': attendance_records
     })
 
-@app.route('/api/attendance/class/<class_name>')
+@bp.route('/api/attendance/class/<class_name>')
 @require_role('teacher')
+@conditional('students', 'users', 'attendance')
 def get_class_attendance(class_name):
     """Get attendance for all students in a class"""
-    students = load_students()
-    class_students = [s for s in students if s['class'] == class_name]
+    return jsonify(build_class_attendance(class_name))
+
+@bp.route('/api/attendance/class/<class_name>/stream')
+@require_role('teacher')
+def stream_class_attendance(class_name):
+    """Stream a class's attendance as Server-Sent Events: a snapshot, then each change"""
+    subscriber = subscribe_class_board(class_name)
+    try:
+        snapshot_data = build_class_attendance(class_name)
+    except Exception:
+        unsubscribe_class_board(subscriber)
+        raise
     
-    attendance = load_attendance()
-    today = date.today().isoformat()
+    @stream_with_context
+    def generate():
+        try:
+            yield format_sse('snapshot', snapshot_data)
+            while True:
+                if subscriber['resync']:
+                    subscriber['resync'] = False
+                    while not subscriber['queue'].empty():
+                        subscriber['queue'].get_nowait()
+                    yield format_sse('snapshot', build_class_attendance(class_name))
+                try:
+                    event, data = subscriber['queue'].get(timeout=BOARD_KEEPALIVE)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event, data)
+        finally:
+            unsubscribe_class_board(subscriber)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # keep nginx from buffering the stream
+    return response
+
+@bp.route('/api/face-registration/class/<class_name>')
+@require_role('principal')
+@conditional('students', 'face_data')
+def get_class_face_registration(class_name):
+    """Get face enrollment status for all students in a class"""
+    students = load_students()
+    face_data = get_face_registry()
     
-    class_attendance = []
-    for student in class_students:
-        student_attendance = {
-            'student': student,
-            'today_status': 'absent'
-        }
-        
-        if today in attendance and str(student['id']) in attendance[today]:
-            student_attendance['today_status'] = attendance[today][str(student['id'])]['status']
-            student_attendance['timestamp'] = attendance[today][str(student['id'])]['timestamp']
-        
-        class_attendance.append(student_attendance)
+    class_enrollment = []
+    for student in students:
+        if student['class'] != class_name:
+            continue
+        face_record = face_data.get(student['roll_number'])
+        class_enrollment.append({
+            'id': student['id'],
+            'name': student['name'],
+            'roll_number': student['roll_number'],
+            'face_registered': face_record is not None,
+            'registered_at': face_record.get('registered_at') if face_record else None
+        })
     
     return jsonify({
         'class': class_name,
-        'date': today,
-        'attendance': class_attendance
+        'total': len(class_enrollment),
+        'registered': sum(1 for s in class_enrollment if s['face_registered']),
+        'students': class_enrollment
     })
 
-@app.route('/api/attendance/remove/<int:student_id>/<date>', methods=['DELETE'])
+@bp.route('/api/metrics/admission')
+@require_role('principal')
+def get_admission_metrics():
+    """Get image endpoint admission control counters for this worker"""
+    with _admission_cond:
+        stats = dict(_admission_stats)
+    stats['shed'] = stats['shed_queue_full'] + stats['shed_timeout']
+    stats['max_in_flight'], stats['max_queue'] = admission_limits()
+    return jsonify(stats)
+
+@METRICS.add_collector
+def collect_admission_metrics():
+    """Report the image admission counters alongside the request metrics"""
+    with _admission_cond:
+        stats = dict(_admission_stats)
+    in_flight = metrics.Gauge('image_requests_in_flight', 'Image requests being processed')
+    in_flight.set(value=stats['in_flight'])
+    queued = metrics.Gauge('image_requests_queued', 'Image requests waiting for a processing slot')
+    queued.set(value=stats['queued'])
+    admitted = metrics.Counter('image_requests_admitted_total', 'Image requests admitted for processing')
+    admitted.inc(amount=stats['admitted'])
+    shed = metrics.Counter('image_requests_shed_total', 'Image requests shed with 503', ('reason',))
+    shed.inc('queue_full', amount=stats['shed_queue_full'])
+    shed.inc('timeout', amount=stats['shed_timeout'])
+    return [in_flight, queued, admitted, shed]
+
+@bp.route('/metrics')
+def prometheus_metrics():
+    """Expose this worker's metrics in the Prometheus text format (principal or trusted localhost only)"""
+    if not is_trusted_client():
+        return jsonify({'error': 'Access denied'}), 403
+    return current_app.response_class(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+@bp.route('/api/profiles')
+@require_role('principal')
+def get_request_profiles():
+    """List recent request profiles, newest first"""
+    profile_dir = current_app.config['PROFILE_DIR']
+    if not profile_dir:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    return jsonify({'profiles': list_request_profiles(profile_dir)})
+
+@bp.route('/api/profiles/<path:filename>')
+@require_role('principal')
+def download_request_profile(filename):
+    """Download a profile (.prof for pstats/snakeviz) or its text report"""
+    profile_dir = current_app.config['PROFILE_DIR']
+    if not profile_dir:
+        return jsonify({'error': 'Profiling is disabled'}), 404
+    return send_from_directory(os.path.abspath(profile_dir), filename, as_attachment=filename.endswith('.prof'))
+
+@bp.route('/api/attendance/remove/<int:student_id>/<date>', methods=['DELETE'])
 @require_role('principal')
+@write_locked
 def remove_attendance(student_id, date):
     """Remove attendance record for a specific student on a specific date"""
     try:
+        # Held under the write lock (see write_locked), so marks committed
+        # meanwhile are not overwritten
         attendance = load_attendance()
         
         if date not in attendance:
@@ -845,6 +2682,8 @@ def remove_attendance(student_id, date):
             del attendance[date]
         
         save_attendance(attendance)
+        record_change('attendance', 'delete', student_id, date=date)
+        publish_attendance_event(student_id, 'removal', {'student_id': student_id, 'date': date})
         
         log_crud_action('ATTENDANCE_REMOVAL', session['user'], f"Removed attendance for student ID {student_id} on {date}")
         
@@ -857,8 +2696,9 @@ def remove_attendance(student_id, date):
     except Exception as e:
         return jsonify({'error': f'Error removing attendance: {str(e)}'}), 500
 
-@app.route('/api/attendance/student/<int:student_id>')
+@bp.route('/api/attendance/student/<int:student_id>')
 @require_role('principal')
+@conditional('students', 'attendance')
 def get_student_attendance_for_principal(student_id):
     """Get all attendance records for a specific student (principal access)"""
     students = load_students()
@@ -874,5 +2714,128 @@ def get_student_attendance_for_principal(student_id):
         'attendance': attendance_records
     })
 
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson')
+}
+STUDENT_EXPORT_FIELDS = ['id', 'roll_number', 'name', 'dob', 'class', 'created_at', 'created_by', 'updated_at', 'updated_by']
+ATTENDANCE_EXPORT_FIELDS = ['date', 'student_id', 'roll_number', 'name', 'class', 'status', 'timestamp', 'method']
+
+def export_rows(rows, fields, export_format):
+    """Serialize row dicts one line at a time as CSV (with a header) or NDJSON"""
+    if export_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row) + '\n'
+        return
+    line = io.StringIO()
+    writer = csv.DictWriter(line, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+        writer.writerow(row)
+    yield line.getvalue()
+
+def export_response(rows, fields, name):
+    """Stream rows as a download in the format given by ?format= (csv by default)"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    response = Response(stream_with_context(export_rows(rows, fields, export_format)), mimetype=mimetype)
+    filename = re.sub(r'[^A-Za-z0-9_.-]+', '-', name)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+@bp.route('/api/export/students')
+@require_role('principal')
+def export_students():
+    """Export students, optionally for one class, as CSV or NDJSON"""
+    class_name = request.args.get('class')
+    students = [s for s in load_students() if not class_name or s['class'] == class_name]
+    return export_response(iter(students), STUDENT_EXPORT_FIELDS, f"students_{class_name}" if class_name else 'students')
+
+@bp.route('/api/export/attendance')
+@require_role('principal')
+def export_attendance():
+    """Export attendance, filtered by class, student_id and start/end dates"""
+    try:
+        start = date.fromisoformat(request.args['start']).isoformat() if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']).isoformat() if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be in YYYY-MM-DD format'}), 400
+    class_name = request.args.get('class')
+    student_id = request.args.get('student_id')
+    students = {str(s['id']): s for s in load_students()
+                if (not class_name or s['class'] == class_name) and (not student_id or str(s['id']) == student_id)}
+    
+    def rows():
+        # Days are read one at a time from the file, which save_attendance keeps
+        # in date order; a file written elsewhere may not be, so scan it all
+        for day, records in iter_store_items('attendance'):
+            if (start and day < start) or (end and day > end):
+                continue
+            for sid, record in records.items():
+                student = students.get(sid)
+                if student:
+                    yield {
+                        'date': day,
+                        'student_id': student['id'],
+                        'roll_number': student['roll_number'],
+                        'name': student['name'],
+                        'class': student['class'],
+                        'status': record.get('status'),
+                        'timestamp': record.get('timestamp'),
+                        'method': record.get('method')
+                    }
+    
+    name = '_'.join(['attendance'] + [part for part in (class_name, student_id, start, end) if part])
+    return export_response(rows(), ATTENDANCE_EXPORT_FIELDS, name)
+
+def configure_logging(log_file):
+    """Set up logging for CRUD operations to a file, or the console if log_file is None"""
+    if log_file:
+        logging.basicConfig(
+            filename=log_file,
+            level=logging.INFO,
+            format='%(asctime)s %(levelname)s %(message)s'
+        )
+    else:
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s %(levelname)s %(message)s'
+        )
+
+# Every entry point builds the app here: python app.py,
+# start_face_recognition.py, vercel_app.py and gunicorn 'app:create_app()'
+def create_app(config=None):
+    """Create and configure the Flask application"""
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    if config:
+        app.config.update(config)
+    CORS(app, supports_credentials=True)
+    if app.config['SHARED_BACKEND_URL']:
+        configure_shared_backend(app)
+    configure_logging(app.config['LOG_FILE'])
+    app.register_blueprint(bp)
+    app.view_functions['static'] = serve_static
+    if app.config['TENANT_ROUTING']:
+        app.before_request(resolve_tenant)
+        if app.config['TENANT_ROUTING'] == 'path':
+            app.wsgi_app = TenantPathMiddleware(app.wsgi_app)
+    if app.config['PROFILE_DIR']:
+        app.before_request(start_request_profile)
+        app.teardown_request(finish_request_profile)
+    with app.app_context():
+        try:
+            load_data_snapshot()
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring data snapshot: {e}")
+    start_snapshot_writer(app)
+    start_backup_scheduler(app)
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 2
+
+The Flask views stay synchronous. This adapter keeps the slow parts on the
+event loop and the work in threads:
+
+- the request body (a base64 camera frame during check-in) is received on
+  the event loop, so a slow upload holds a coroutine and a buffer rather
+  than a worker thread;
+- once the body is complete the request runs in a bounded thread pool,
+  where data-store I/O and image processing block only that thread (image
+  requests are further limited by image_admission);
+- responses with a Content-Length are read whole in that same thread;
+  streamed responses (SSE attendance boards, exports) are iterated by a
+  thread of their own, which may wait on the stream as long as it stays
+  open without taking a thread from the pool, and the stream is closed
+  when the client disconnects.
+
+Settings (environment variables):
+    ASGI_THREADS     threads running Flask requests (default 32)
+    ASGI_MAX_BODY    largest accepted request body in bytes (default 16 MiB)
+"""
+
+import asyncio
+import contextvars
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 32))
+ASGI_MAX_BODY = int(os.environ.get('ASGI_MAX_BODY', 16 * 1024 * 1024))
+STREAM_BUFFER = 8  # chunks a stream thread reads ahead of the client
+
+class ClientDisconnected(Exception):
+    pass
+
+def build_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope and its complete body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = f"HTTP_{name}"
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            environ[key] = f"{environ[key]}{separator}{value}" if key in environ else value
+    return environ
+
+def pump_stream(result, context, chunks, loop, stopped):
+    """Iterate a WSGI response, handing its chunks to the event loop
+
+    Chunks are read and the response closed in the context the app was
+    called in, so the request context pushed by stream_with_context is
+    still current. The end of the stream is signalled with None, an error
+    with the exception.
+    """
+    def hand_over(item):
+        asyncio.run_coroutine_threadsafe(chunks.put(item), loop).result()
+
+    try:
+        iterator = context.run(iter, result)
+        while not stopped.is_set():
+            chunk = context.run(next, iterator, None)
+            if stopped.is_set():
+                break
+            hand_over(chunk)
+            if chunk is None:
+                break
+    except Exception as e:
+        if not stopped.is_set():
+            hand_over(e)
+    finally:
+        if hasattr(result, 'close'):
+            context.run(result.close)
+
+class AsgiAdapter:
+    """Serve a WSGI application over ASGI, buffering request bodies on the event loop"""
+
+    def __init__(self, wsgi_app, threads=ASGI_THREADS, max_body=ASGI_MAX_BODY):
+        self.wsgi_app = wsgi_app
+        self.max_body = max_body
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Unsupported ASGI scope type {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Receive the whole request body, or None if it exceeds max_body"""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                return b''.join(chunks)
+
+    async def http(self, scope, receive, send):
+        try:
+            body = await self.read_body(receive)
+        except ClientDisconnected:
+            return
+        if body is None:
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'text/plain'), (b'connection', b'close')]})
+            await send({'type': 'http.response.body', 'body': b'Request body too large'})
+            return
+
+        loop = asyncio.get_running_loop()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        def call_app():
+            """Return (whole body, None) for responses with a length, else (None, stream)"""
+            result = self.wsgi_app(build_environ(scope, body), start_response)
+            if not any(name == b'content-length' for name, _ in response.get('headers', [])):
+                return None, result
+            try:
+                return b''.join(result), None
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        # Streams are read later by another thread, in this same context
+        context = contextvars.copy_context()
+        content, result = await loop.run_in_executor(self.executor, context.run, call_app)
+        if result is None:
+            await send({'type': 'http.response.start', 'status': response['status'],
+                        'headers': response['headers']})
+            await send({'type': 'http.response.body', 'body': content})
+            return
+        await self.stream(result, context, response, receive, send)
+
+    async def stream(self, result, context, response, receive, send):
+        """Send a streamed response, iterated by a thread of its own"""
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue(maxsize=STREAM_BUFFER)
+        stopped = threading.Event()
+        threading.Thread(target=pump_stream, args=(result, context, chunks, loop, stopped),
+                         name='asgi-stream', daemon=True).start()
+        disconnected = asyncio.ensure_future(self.wait_for_disconnect(receive))
+        try:
+            started = False
+            while True:
+                chunk = asyncio.ensure_future(chunks.get())
+                await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if not chunk.done():
+                    chunk.cancel()
+                    break
+                chunk = chunk.result()
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                if not started:
+                    await send({'type': 'http.response.start', 'status': response['status'],
+                                'headers': response['headers']})
+                    started = True
+                if chunk is None:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            disconnected.cancel()
+            stopped.set()
+            # Make room for a chunk the stream thread may be waiting to hand over
+            while not chunks.empty():
+                chunks.get_nowait()
+
+    async def wait_for_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+def __getattr__(name):
+    # The production app is built when uvicorn first looks up asgi:app, so
+    # importing AsgiAdapter (e.g. in tests) starts no snapshot writer
+    global app
+    if name == 'app':
+        # Flask requests run on the ASGI_THREADS pool (image admission reserves some)
+        app = AsgiAdapter(create_app({'WORKER_THREADS': ASGI_THREADS}))
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
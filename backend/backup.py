@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Online, incremental backups of the data stores
+
+app.create_backup() hard-links every store file into a staging directory
+while holding the store write lock, which takes a moment, and this module
+then hashes and compresses the copies with writers already running again.
+Store contents are kept once per distinct SHA-256, so a backup of stores
+that did not change since the previous one only writes a new manifest.
+
+Backup directory layout:
+
+    objects/<sha256>.json.gz   gzip-compressed JSON of one store
+    <backup id>.json           manifest: {'created_at': str,
+                                          'stores': {name: {'sha256': str, 'size': int}}}
+
+Usage:
+    python backup.py create [--backup-dir backups] [--data-dir DIR]
+    python backup.py list
+    python backup.py restore 20250901T080000
+    python backup.py prune --keep 30
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+HASH_CHUNK = 1024 * 1024
+GZIP_LEVEL = 6
+
+def file_sha256(path):
+    """Hash a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def object_path(backup_dir, sha256):
+    return os.path.join(backup_dir, 'objects', f"{sha256}.json.gz")
+
+def replace_atomically(path, write):
+    """Write a file through write(f) on a temporary file, then rename it into place"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def write_backup(backup_dir, files):
+    """Store captured store files ({name: path}) as a new backup and return (backup id, manifest)"""
+    os.makedirs(os.path.join(backup_dir, 'objects'), exist_ok=True)
+    created_at = datetime.now()
+    stores = {}
+    for name, path in files.items():
+        sha256 = file_sha256(path)
+        target = object_path(backup_dir, sha256)
+        if not os.path.exists(target):
+            def write(f, path=path):
+                with open(path, 'rb') as src, gzip.GzipFile(fileobj=f, mode='wb', compresslevel=GZIP_LEVEL, mtime=0) as dst:
+                    shutil.copyfileobj(src, dst, HASH_CHUNK)
+            replace_atomically(target, write)
+        stores[name] = {'sha256': sha256, 'size': os.path.getsize(path)}
+    backup_id = created_at.strftime('%Y%m%dT%H%M%S%f')
+    manifest = {'created_at': created_at.isoformat(), 'stores': stores}
+    replace_atomically(os.path.join(backup_dir, f"{backup_id}.json"),
+                       lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+    return backup_id, manifest
+
+def list_backups(backup_dir):
+    """Return [(backup id, manifest)], oldest first"""
+    if not os.path.isdir(backup_dir):
+        return []
+    backups = []
+    for filename in sorted(os.listdir(backup_dir)):
+        if filename.endswith('.json'):
+            with open(os.path.join(backup_dir, filename)) as f:
+                backups.append((filename[:-len('.json')], json.load(f)))
+    return backups
+
+def read_backup(backup_dir, backup_id):
+    """Return {name: JSON bytes} of a backup, raising ValueError if it is missing or corrupt"""
+    manifest_path = os.path.join(backup_dir, f"{os.path.basename(backup_id)}.json")
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"No backup {backup_id} in {backup_dir}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    contents = {}
+    for name, entry in manifest['stores'].items():
+        with gzip.open(object_path(backup_dir, entry['sha256']), 'rb') as f:
+            raw = f.read()
+        if hashlib.sha256(raw).hexdigest() != entry['sha256']:
+            raise ValueError(f"Backup {backup_id} has a corrupt copy of {name}")
+        contents[name] = raw
+    return contents
+
+def prune_backups(backup_dir, keep):
+    """Keep the newest `keep` backups, delete objects no longer referenced and return how many backups were removed"""
+    backups = list_backups(backup_dir)
+    removed = backups[:-keep] if keep > 0 else backups
+    for backup_id, _ in removed:
+        os.remove(os.path.join(backup_dir, f"{backup_id}.json"))
+    referenced = {entry['sha256'] for _, manifest in backups[len(removed):] for entry in manifest['stores'].values()}
+    objects_dir = os.path.join(backup_dir, 'objects')
+    if os.path.isdir(objects_dir):
+        for filename in os.listdir(objects_dir):
+            if filename.endswith('.json.gz') and filename[:-len('.json.gz')] not in referenced:
+                os.remove(os.path.join(objects_dir, filename))
+    return len(removed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Create, list, restore or prune online backups of the data stores')
+    parser.add_argument('command', choices=['create', 'list', 'restore', 'prune'])
+    parser.add_argument('backup_id', nargs='?', help='backup to restore')
+    parser.add_argument('--backup-dir', help='backup directory (default: backups inside the data directory)')
+    parser.add_argument('--data-dir', help='directory holding the JSON stores (default: current directory)')
+    parser.add_argument('--keep', type=int, default=30, help='backups kept by prune (default: 30)')
+    args = parser.parse_args()
+
+    import app
+    if args.data_dir:
+        app.DATA_DIR = args.data_dir
+    backup_dir = args.backup_dir or app.get_backup_dir()
+
+    try:
+        if args.command == 'create':
+            backup_id, manifest = app.create_backup(backup_dir)
+            print(f"✅ Backup {backup_id}: {len(manifest['stores'])} stores in {backup_dir}")
+        elif args.command == 'list':
+            for backup_id, manifest in list_backups(backup_dir):
+                size = sum(entry['size'] for entry in manifest['stores'].values())
+                print(f"{backup_id}  {manifest['created_at']}  {len(manifest['stores'])} stores, {size} bytes")
+        elif args.command == 'restore':
+            if not args.backup_id:
+                parser.error('restore needs a backup id (see: python backup.py list)')
+            count = app.restore_backup(args.backup_id, backup_dir)
+            print(f"✅ Restored {count} stores from backup {args.backup_id}")
+        else:
+            count = prune_backups(backup_dir, args.keep)
+            print(f"✅ Removed {count} backups, kept the newest {args.keep}")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Shared pytest fixtures: apps built on a per-test data directory under
+tmp_path, so test data is cleaned up with pytest's other temporary files,
+and a stand-in for another worker holding the store write lock
+"""
+
+import os
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BACKEND_DIR)
+
+import app as app_module
+
+@pytest.fixture
+def app_config(tmp_path):
+    """Config for a test app: its own data directory, no log file, no snapshots"""
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    return {'DATA_DIR': str(data_dir), 'LOG_FILE': None, 'SNAPSHOT_FILE': None}
+
+@pytest.fixture
+def flask_app(app_config):
+    return app_module.create_app(app_config)
+
+# Takes the flock store_write_lock() takes, then holds it until stdin closes
+LOCK_SCRIPT = """
+import fcntl, sys
+lock_file = open(sys.argv[1], 'a')
+fcntl.flock(lock_file, fcntl.LOCK_EX)
+print('locked', flush=True)
+sys.stdin.read()
+"""
+
+@pytest.fixture
+def other_worker_lock(app_config):
+    """Context manager holding the data directory's write lock from another process"""
+    @contextmanager
+    def hold():
+        process = subprocess.Popen([sys.executable, '-c', LOCK_SCRIPT, os.path.join(app_config['DATA_DIR'], '.write.lock')],
+                                   stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            assert process.stdout.readline().strip() == 'locked'
+            yield
+        finally:
+            process.stdin.close()
+            process.wait()
+    return hold
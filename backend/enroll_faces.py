@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Batch face enrollment from a folder of ID photos
+
+Image files are matched to students by roll number (2024001.jpg) or by name
+(John_Doe.png). Embeddings are extracted in parallel across all cores and
+written to the face data store in one bulk commit. Progress is checkpointed
+so an interrupted run can be resumed by running the same command again.
+
+Usage:
+    python enroll_faces.py photos/             # enroll everyone in photos/
+    python enroll_faces.py photos/ --reembed   # only recompute stale embeddings
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from PIL import Image
+
+import app
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+CHECKPOINT_EVERY = 50  # results between progress checkpoint writes
+
+def normalize_name(name):
+    """Normalize a student name or file stem for matching"""
+    return ' '.join(name.replace('_', ' ').replace('-', ' ').lower().split())
+
+def match_images(image_dir, students):
+    """Map image paths to roll numbers, returning (matches, unmatched files)"""
+    by_roll = {s['roll_number']: s['roll_number'] for s in students}
+    by_name = {normalize_name(s['name']): s['roll_number'] for s in students}
+    matches, unmatched = {}, []
+    for filename in sorted(os.listdir(image_dir)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        roll_number = by_roll.get(stem) or by_name.get(normalize_name(stem))
+        if roll_number:
+            matches[os.path.join(image_dir, filename)] = roll_number
+        else:
+            unmatched.append(filename)
+    return matches, unmatched
+
+def extract_embedding(path):
+    """Worker: load an image and compute its embedding"""
+    with Image.open(path) as image:
+        return app.compute_face_embedding(image)
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            checkpoint = json.load(f)
+        if checkpoint.get('model') == app.FACE_EMBEDDING_MODEL:
+            return checkpoint
+    return {'model': app.FACE_EMBEDDING_MODEL, 'results': {}}
+
+def save_checkpoint(path, checkpoint):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+def commit_enrollments(matches, results):
+    """Write the extracted embeddings to the face data store and return how many were written
+
+    Face data and the roster are re-read under the store write lock, so
+    registrations made by the running app meanwhile are kept and students
+    deleted meanwhile are not enrolled again.
+    """
+    registered_at = datetime.now().isoformat()
+    enrolled = 0
+    with app.store_write_lock():
+        face_data = app.load_face_data()
+        rolls = {s.get('roll_number') for s in app.load_students()}
+        for path, roll_number in matches.items():
+            if path not in results or roll_number not in rolls:
+                continue
+            face_data[roll_number] = {
+                'registered_at': registered_at,
+                'face_detected': True,
+                'frames': 1,
+                'embedding': results[path],
+                'model': app.FACE_EMBEDDING_MODEL,
+                'source': os.path.basename(path)
+            }
+            enrolled += 1
+        if enrolled:
+            app.save_face_data(face_data)
+    return enrolled
+
+def main():
+    parser = argparse.ArgumentParser(description='Enroll student faces from a folder of photos')
+    parser.add_argument('image_dir', help='directory of photos named by roll number or student name')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes (default: all cores)')
+    parser.add_argument('--reembed', action='store_true',
+                        help=f'only process students whose stored embedding is not {app.FACE_EMBEDDING_MODEL}')
+    parser.add_argument('--checkpoint', help='progress file (default: <image_dir>/.enroll_progress.json)')
+    parser.add_argument('--dry-run', action='store_true', help='report matches without extracting anything')
+    parser.add_argument('--data-dir', help='directory holding the JSON stores, e.g. tenants/<campus> (default: DATA_DIR)')
+    args = parser.parse_args()
+    if args.data_dir:
+        app.DATA_DIR = args.data_dir
+
+    if not os.path.isdir(args.image_dir):
+        print(f"❌ Not a directory: {args.image_dir}")
+        return 1
+    checkpoint_path = args.checkpoint or os.path.join(args.image_dir, '.enroll_progress.json')
+
+    matches, unmatched = match_images(args.image_dir, app.load_students())
+    for filename in unmatched:
+        print(f"⚠️  No student matches {filename}, skipping")
+
+    if args.reembed:
+        face_data = app.load_face_data()
+        matches = {path: roll for path, roll in matches.items()
+                   if face_data.get(roll, {}).get('model') != app.FACE_EMBEDDING_MODEL}
+
+    checkpoint = load_checkpoint(checkpoint_path)
+    results = checkpoint['results']
+    pending = [path for path in matches if path not in results]
+    print(f"📷 {len(matches)} photos matched, {len(matches) - len(pending)} already done, {len(pending)} to process")
+    if args.dry_run:
+        return 0
+
+    failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {executor.submit(extract_embedding, path): path for path in pending}
+            for done, future in enumerate(as_completed(futures), 1):
+                path = futures[future]
+                try:
+                    results[path] = future.result()
+                    status = '✅'
+                except Exception as e:
+                    failed += 1
+                    status = f'❌ {e}'
+                print(f"[{done}/{len(pending)}] {os.path.basename(path)} -> {matches[path]} {status}")
+                if done % CHECKPOINT_EVERY == 0:
+                    save_checkpoint(checkpoint_path, checkpoint)
+        save_checkpoint(checkpoint_path, checkpoint)
+
+    # One bulk commit of everything extracted (including earlier resumed runs)
+    enrolled = commit_enrollments(matches, results)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"\n✅ Enrolled {enrolled} students ({failed} failed, {len(unmatched)} unmatched)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
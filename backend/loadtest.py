@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Load testing harness
+
+Generates (or reuses) a synthetic dataset, then drives the app through
+realistic flows and reports throughput and p50/p95/p99 latency per endpoint
+as JSON. Two drivers are available: the Flask test client (in-process, no
+network) and a multi-threaded HTTP driver against a real server on a local
+port.
+
+Scenarios:
+    teacher    teacher logs in, opens the dashboard, roster and class attendance
+    checkin    morning burst: students log in and mark attendance concurrently
+    principal  principal opens the teacher list, roster and master log
+
+Usage:
+    python loadtest.py --students 5000 --years 2 --driver both --threads 16
+    python loadtest.py --data-dir bench_data --scenario checkin --output results.json
+"""
+
+import argparse
+import base64
+import http.cookiejar
+import io
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import synthetic_data
+
+SCENARIOS = ('teacher', 'checkin', 'principal')
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    # The smallest value with at least pct% of values at or below it
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100) - 1))
+    return sorted_values[index]
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint latency and status collection"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, label, seconds, status):
+        with self.lock:
+            entry = self.samples.setdefault(label, {'latencies': [], 'statuses': {}})
+            entry['latencies'].append(seconds)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+
+    def report(self, wall_time):
+        endpoints = {}
+        for label, entry in sorted(self.samples.items()):
+            latencies = sorted(entry['latencies'])
+            errors = sum(n for status, n in entry['statuses'].items() if status >= 400)
+            endpoints[label] = {
+                'count': len(latencies),
+                'errors': errors,
+                'statuses': {str(k): v for k, v in sorted(entry['statuses'].items())},
+                'throughput_rps': round(len(latencies) / wall_time, 2) if wall_time else None,
+                'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+                'max_ms': round(latencies[-1] * 1000, 3)
+            }
+        total = sum(e['count'] for e in endpoints.values())
+        return {
+            'wall_time_s': round(wall_time, 3),
+            'requests': total,
+            'throughput_rps': round(total / wall_time, 2) if wall_time else None,
+            'endpoints': endpoints
+        }
+
+class TestClientSession:
+    """One virtual user talking to the app through the Flask test client"""
+
+    def __init__(self, app, recorder):
+        self.client = app.test_client()
+        self.recorder = recorder
+
+    def request(self, method, path, label, json_body=None):
+        start = time.perf_counter()
+        response = self.client.open(path, method=method, json=json_body)
+        body = response.get_data()
+        self.recorder.record(label, time.perf_counter() - start, response.status_code)
+        return response.status_code, body
+
+class HttpSession:
+    """One virtual user talking to a real server over HTTP, with its own cookie jar"""
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, label, json_body=None):
+        data = json.dumps(json_body).encode() if json_body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, body = e.code, e.read()
+        self.recorder.record(label, time.perf_counter() - start, status)
+        return status, body
+
+def make_image():
+    """A small JPEG frame like the student dashboard uploads"""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 240), (120, 100, 90)).save(buffer, 'JPEG', quality=80)
+    return 'data:image/jpeg;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+def teacher_flow(session, dataset, rng):
+    teacher = rng.choice(dataset['teachers'])
+    class_name = rng.choice(dataset['classes'])
+    student_id = rng.randint(1, dataset['students'])
+    session.request('POST', '/login', 'POST /login', {'username': teacher, 'password': 'teacher123'})
+    session.request('GET', '/dashboard', 'GET /dashboard')
+    session.request('GET', '/api/user', 'GET /api/user')
+    session.request('GET', '/api/students', 'GET /api/students')
+    session.request('GET', f'/api/attendance/class/{class_name}', 'GET /api/attendance/class/<class>')
+    session.request('GET', f'/api/students/{student_id}/attendance', 'GET /api/students/<id>/attendance')
+
+def checkin_flow(session, dataset, rng, student_id, image):
+    roll_number = synthetic_data.roll_number(student_id, dataset['students'])
+    session.request('POST', '/student/login', 'POST /student/login', {'roll_number': roll_number})
+    status, body = session.request('GET', '/api/student/face-status', 'GET /api/student/face-status')
+    if status == 200 and not json.loads(body)['face_registered']:
+        session.request('POST', '/api/student/register-face', 'POST /api/student/register-face', {'image': image})
+    session.request('POST', '/api/student/attendance', 'POST /api/student/attendance', {'image': image})
+    session.request('GET', '/api/student/attendance-history', 'GET /api/student/attendance-history')
+
+def principal_flow(session, dataset, rng):
+    class_name = rng.choice(dataset['classes'])
+    session.request('POST', '/login', 'POST /login', {'username': 'principal', 'password': 'principal123'})
+    session.request('GET', '/dashboard', 'GET /dashboard')
+    session.request('GET', '/api/teachers', 'GET /api/teachers')
+    session.request('GET', '/api/students', 'GET /api/students')
+    session.request('GET', f'/api/face-registration/class/{class_name}', 'GET /api/face-registration/class/<class>')
+    session.request('GET', '/master_log', 'GET /master_log')
+
+def run_scenario(name, new_session, dataset, threads, iterations, seed):
+    """Run one scenario with the given concurrency and return its report"""
+    recorder = LatencyRecorder()
+    image = make_image() if name == 'checkin' else None
+    # Each check-in is a different student, as in the real morning burst
+    checkin_ids = random.Random(seed).sample(range(1, dataset['students'] + 1), min(iterations, dataset['students']))
+
+    def one_iteration(i):
+        rng = random.Random(seed * 100003 + i)
+        session = new_session(recorder)
+        if name == 'teacher':
+            teacher_flow(session, dataset, rng)
+        elif name == 'checkin':
+            checkin_flow(session, dataset, rng, checkin_ids[i % len(checkin_ids)], image)
+        else:
+            principal_flow(session, dataset, rng)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(one_iteration, i) for i in range(iterations)]:
+            future.result()
+    report = recorder.report(time.perf_counter() - start)
+    report.update({'threads': threads, 'iterations': iterations})
+    return report
+
+def start_http_server(app):
+    """Serve the app on a free local port in a background thread"""
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='loadtest-server', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+def prepare_dataset(work_dir, data_dir=None, students=500, years=1, seed=42):
+    """Copy data_dir into work_dir (or generate a dataset there) and describe it"""
+    if not data_dir:
+        print(f"Generating {students} students, {years} years of attendance...", file=sys.stderr)
+        return synthetic_data.generate_dataset(work_dir, students, years, seed=seed)
+    for filename in os.listdir(data_dir):
+        if filename.endswith('.json'):
+            shutil.copy(os.path.join(data_dir, filename), work_dir)
+    with open(os.path.join(work_dir, 'students.json')) as f:
+        student_list = json.load(f)
+    with open(os.path.join(work_dir, 'users.json')) as f:
+        users = json.load(f)
+    return {
+        'students': len(student_list),
+        'classes': sorted({s['class'] for s in student_list}),
+        'teachers': [u for u, user in users.items() if user['role'] == 'teacher'],
+        'source': data_dir
+    }
+
+def create_test_app(work_dir):
+    """Build the app against a dataset directory, logging into it and never snapshotting"""
+    import app as app_module
+    return app_module.create_app({
+        'DATA_DIR': work_dir,
+        'LOG_FILE': os.path.join(work_dir, 'master.log'),
+        'SNAPSHOT_INTERVAL': 0
+    })
+
+def write_report(results, path=None):
+    """Write a JSON report to path, or stdout if no path is given"""
+    output = json.dumps(results, indent=2)
+    if path:
+        with open(path, 'w') as f:
+            f.write(output + '\n')
+        print(f"✅ Report written to {path}", file=sys.stderr)
+    else:
+        print(output)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the app against a synthetic dataset')
+    parser.add_argument('--data-dir', help='reuse a dataset made by synthetic_data.py (default: generate one)')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--driver', choices=['test-client', 'http', 'both'], default='test-client')
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=50, help='flows per scenario')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    # Work on a copy so check-ins don't change the source dataset
+    work_dir = tempfile.mkdtemp(prefix='loadtest-')
+    try:
+        dataset = prepare_dataset(work_dir, args.data_dir, args.students, args.years, args.seed)
+        app = create_test_app(work_dir)
+
+        drivers = ['test-client', 'http'] if args.driver == 'both' else [args.driver]
+        scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+        results = {'dataset': dataset, 'drivers': {}}
+        for driver in drivers:
+            server = None
+            if driver == 'http':
+                server, base_url = start_http_server(app)
+                new_session = lambda recorder: HttpSession(base_url, recorder)
+            else:
+                new_session = lambda recorder: TestClientSession(app, recorder)
+            results['drivers'][driver] = {}
+            for name in scenarios:
+                print(f"Running {name} scenario with {driver} driver...", file=sys.stderr)
+                results['drivers'][driver][name] = run_scenario(name, new_session, dataset, args.threads,
+                                                                args.iterations, args.seed)
+            if server:
+                server.shutdown()
+
+        write_report(results, args.output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+In-process metrics exposed in the Prometheus text format
+
+A small stand-in for prometheus_client so the app keeps its short
+dependency list. Metrics are per process: with several gunicorn workers
+each one reports its own series, so scrape them individually or sum them
+in the query.
+
+Metric types:
+    Counter    monotonically increasing value per label set
+    Gauge      value that can go up and down per label set
+    Histogram  cumulative bucket counts, sum and count per label set
+"""
+
+import math
+import threading
+
+# Seconds; the Prometheus client library defaults
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+def format_value(value):
+    """Format a sample value the way Prometheus expects"""
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def format_labels(names, values, extra=None):
+    """Format a label set as {name="value",...}"""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+class Metric:
+    """Base class holding one value per label set"""
+    type_name = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self):
+        """Yield (suffix, label values, extra label, value) for every sample"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield '', key, None, value
+
+    def render(self):
+        """Render the metric in the Prometheus text format"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{format_labels(self.labelnames, key, extra)} {format_value(value)}")
+        return '\n'.join(lines)
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, *labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+class Gauge(Counter):
+    type_name = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+                    break
+            entry['sum'] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(entry['counts']), entry['sum']) for key, entry in self._values.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield '_bucket', key, ('le', format_value(float(bound))), cumulative
+            yield '_sum', key, None, total
+            yield '_count', key, None, cumulative
+
+class Registry:
+    """A named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collect):
+        """Register a function returning metrics built fresh at every scrape"""
+        with self._lock:
+            self._collectors.append(collect)
+        return collect
+
+    def render(self):
+        """Render every metric in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collect in collectors:
+            metrics.extend(collect())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Replay real traffic from master.log against a synthetic dataset
+
+The werkzeug access lines in master.log are parsed into a request trace and
+split into sessions (per client, starting at each login). Each session is
+mapped onto the synthetic dataset (users, roll numbers, student IDs,
+dates) and replayed at 1x/10x/100x speed with a bounded number of
+concurrent sessions, reporting latency per endpoint like loadtest.py.
+
+Usage:
+    python replay.py master.log --speed 10 --concurrency 16
+    python replay.py master.log --speed 100 --driver http --data-dir bench_data --output replay.json
+    python replay.py master.log --dump-trace trace.json   # just write the parsed trace
+"""
+
+import argparse
+import itertools
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import loadtest
+import synthetic_data
+
+# 2025-07-25 06:38:17,311 INFO 127.0.0.1 - - [25/Jul/2025 06:38:17] "POST /login HTTP/1.1" 200 -
+# (werkzeug wraps some request lines in one or more ANSI colour codes)
+ACCESS_LINE = re.compile(
+    r'^(?P<ts>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) \w+ (?P<client>\S+) - - \[[^\]]*\] '
+    r'"(?:\x1b\[[\d;]*m)*(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+(?:\x1b\[0m)?" (?P<status>\d{3})'
+)
+DATE_SEGMENT = re.compile(r'\d{4}-\d{2}-\d{2}')
+ID_SEGMENT = re.compile(r'(?<=/)\d+(?=/|$)')
+TEACHER_SEGMENT = re.compile(r'(?<=^/api/teachers/)[^/?]+')
+LOGIN_PATHS = ('/login', '/student/login')
+
+def parse_log(path):
+    """Parse werkzeug access lines into a list of requests, oldest first"""
+    trace = []
+    with open(path, 'r', errors='replace') as f:
+        for line in f:
+            match = ACCESS_LINE.match(line)
+            if not match:
+                continue
+            trace.append({
+                'time': datetime.strptime(match['ts'], '%Y-%m-%d %H:%M:%S,%f').timestamp(),
+                'client': match['client'],
+                'method': match['method'],
+                'path': match['path'],
+                'status': int(match['status'])
+            })
+    trace.sort(key=lambda r: r['time'])
+    return trace
+
+def infer_role(requests):
+    """Guess who was logged in from what a session requested"""
+    paths = [r['path'] for r in requests]
+    if any(p.startswith(('/student/login', '/api/student/')) for p in paths):
+        return 'student'
+    if any(p.startswith(('/api/teachers', '/master_log', '/teachers_list', '/static/principal.js'))
+           or r['method'] == 'DELETE' for p, r in zip(paths, requests)):
+        return 'principal'
+    return 'teacher'
+
+def split_sessions(trace):
+    """Split the trace into per-client sessions that start at each login"""
+    sessions, current = [], {}
+    for request in trace:
+        client = request['client']
+        starts_new = request['method'] == 'POST' and request['path'] in LOGIN_PATHS
+        if client not in current or starts_new:
+            current[client] = {'client': client, 'requests': []}
+            sessions.append(current[client])
+        current[client]['requests'].append(request)
+    for session in sessions:
+        session['role'] = infer_role(session['requests'])
+    return sessions
+
+def compress_timeline(sessions, speed, max_gap):
+    """Assign each request a replay offset in seconds, capping idle gaps between requests"""
+    requests = sorted((r for s in sessions for r in s['requests']), key=lambda r: r['time'])
+    offset, previous = 0.0, None
+    for request in requests:
+        if previous is not None:
+            offset += min((request['time'] - previous) / speed, max_gap)
+        request['offset'] = offset
+        previous = request['time']
+    return offset
+
+def endpoint_label(method, path):
+    """Group concrete paths into endpoints, e.g. GET /api/students/<id>/attendance"""
+    path = path.split('?')[0]
+    path = DATE_SEGMENT.sub('<date>', path)
+    path = ID_SEGMENT.sub('<id>', path)
+    path = TEACHER_SEGMENT.sub('<username>', path)
+    return f"{method} {path}"
+
+class SessionMapper:
+    """Maps identities in a recorded session onto the synthetic dataset
+
+    Reads map recorded student IDs onto the lower half of the roster; deletes
+    take never-reused IDs from the top, so a recorded delete followed by a
+    re-created student with the same ID does not turn later reads into 404s.
+    """
+
+    def __init__(self, dataset, rng, image, delete_ids):
+        self.dataset = dataset
+        self.delete_ids = delete_ids
+        self.rng = rng
+        self.image = image
+        self.readable = max(1, dataset['students'] // 2)
+        self.student_id = rng.randint(1, self.readable)
+        self.teacher = rng.choice(dataset['teachers'])
+        self.day = date.today() - timedelta(days=rng.randint(1, 30))
+
+    def roll_number(self):
+        return synthetic_data.roll_number(self.student_id, self.dataset['students'])
+
+    def path(self, method, path):
+        if method == 'DELETE' and path.startswith('/api/students/'):
+            path = ID_SEGMENT.sub(lambda m: str(next(self.delete_ids)), path)
+        else:
+            path = ID_SEGMENT.sub(lambda m: str((int(m.group()) - 1) % self.readable + 1), path)
+        path = DATE_SEGMENT.sub(self.day.isoformat(), path)
+        return TEACHER_SEGMENT.sub(self.teacher, path)
+
+    def body(self, method, path, role):
+        """Request body for a replayed request (the log does not record bodies)"""
+        if method == 'POST' and path == '/login':
+            if role == 'principal':
+                return {'username': 'principal', 'password': 'principal123'}
+            return {'username': self.teacher, 'password': 'teacher123'}
+        if method == 'POST' and path == '/student/login':
+            return {'roll_number': self.roll_number()}
+        if method == 'POST' and path in ('/api/student/attendance', '/api/student/register-face'):
+            return {'image': self.image}
+        if method == 'POST' and path == '/api/students':
+            return {'name': f"Replay Student {self.rng.randrange(10 ** 9)}", 'dob': '2012-05-01',
+                    'class': self.rng.choice(self.dataset['classes'])}
+        if method == 'PUT' and path.startswith('/api/students/'):
+            return {'class': self.rng.choice(self.dataset['classes'])}
+        if method == 'PUT' and path.startswith('/api/teachers/'):
+            return {'name': f"Teacher {self.rng.randrange(1000)}"}
+        if method == 'POST' and path == '/api/change_password':
+            # Keep the password unchanged so later sessions can still log in
+            return {'current_password': 'teacher123', 'new_password': 'teacher123'}
+        if method in ('POST', 'PUT'):
+            return {}
+        return None
+
+def replay(sessions, new_session, dataset, concurrency, seed):
+    """Replay sessions on their recorded timeline and return the latency report"""
+    recorder = loadtest.LatencyRecorder()
+    image = loadtest.make_image()
+    lag = {'max': 0.0, 'total': 0.0, 'count': 0}
+    lag_lock = threading.Lock()
+    counter = itertools.count(dataset['students'], -1)
+    counter_lock = threading.Lock()
+
+    def next_delete_id():
+        with counter_lock:
+            return max(1, next(counter))
+    delete_ids = iter(next_delete_id, None)
+    start = time.perf_counter()
+
+    def run_session(index, recorded):
+        mapper = SessionMapper(dataset, random.Random(seed * 100003 + index), image, delete_ids)
+        session = new_session(recorder)
+        for request in recorded['requests']:
+            delay = start + request['offset'] - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lag_lock:
+                behind = max(0.0, -delay)
+                lag['max'] = max(lag['max'], behind)
+                lag['total'] += behind
+                lag['count'] += 1
+            path = request['path'] if request['path'].startswith('/static/') else mapper.path(request['method'], request['path'])
+            body = mapper.body(request['method'], path.split('?')[0], recorded['role'])
+            session.request(request['method'], path, endpoint_label(request['method'], request['path']), body)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_session, i, s) for i, s in enumerate(sessions)]
+        for future in futures:
+            future.result()
+    report = recorder.report(time.perf_counter() - start)
+    report['schedule_lag_s'] = {
+        'max': round(lag['max'], 3),
+        'mean': round(lag['total'] / lag['count'], 3) if lag['count'] else 0.0
+    }
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay master.log traffic against a synthetic dataset')
+    parser.add_argument('log', help='log file with werkzeug access lines (e.g. master.log)')
+    parser.add_argument('--speed', type=float, default=1, help='replay speed multiplier (1, 10, 100, ...)')
+    parser.add_argument('--max-gap', type=float, default=5,
+                        help='cap idle gaps between requests at this many seconds of replay time')
+    parser.add_argument('--concurrency', type=int, default=16, help='sessions replayed at once')
+    parser.add_argument('--driver', choices=['test-client', 'http'], default='test-client')
+    parser.add_argument('--data-dir', help='reuse a dataset made by synthetic_data.py (default: generate one)')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--dump-trace', help='write the parsed trace as JSON and exit')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    sessions = split_sessions(parse_log(args.log))
+    duration = compress_timeline(sessions, args.speed, args.max_gap)
+    requests = sum(len(s['requests']) for s in sessions)
+    print(f"Parsed {requests} requests in {len(sessions)} sessions, replay takes ~{duration:.1f}s", file=sys.stderr)
+    if args.dump_trace:
+        loadtest.write_report({'sessions': sessions}, args.dump_trace)
+        return 0
+
+    work_dir = tempfile.mkdtemp(prefix='replay-')
+    try:
+        dataset = loadtest.prepare_dataset(work_dir, args.data_dir, args.students, args.years, args.seed)
+        app = loadtest.create_test_app(work_dir)
+        server = None
+        if args.driver == 'http':
+            server, base_url = loadtest.start_http_server(app)
+            new_session = lambda recorder: loadtest.HttpSession(base_url, recorder)
+        else:
+            new_session = lambda recorder: loadtest.TestClientSession(app, recorder)
+        report = replay(sessions, new_session, dataset, args.concurrency, args.seed)
+        if server:
+            server.shutdown()
+        report.update({
+            'source': args.log,
+            'speed': args.speed,
+            'max_gap_s': args.max_gap,
+            'concurrency': args.concurrency,
+            'driver': args.driver,
+            'sessions': len(sessions),
+            'dataset': dataset
+        })
+        loadtest.write_report(report, args.output)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
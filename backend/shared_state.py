@@ -0,0 +1,194 @@
+"""
+Shared state for running several app servers behind a load balancer
+
+With SHARED_BACKEND_URL set, create_app() keeps sessions server-side and
+shares data revisions and cache invalidations between nodes through a
+Redis-compatible server:
+
+    redis://host:6379/0    a Redis (or Valkey, KeyDB...) server; needs the redis package
+    memory://name          MemoryRedis, an in-process stand-in shared by every app
+                           created with the same name (tests, single-node setups)
+
+Keys and channels:
+    session:<sid>          JSON session data, expiring after PERMANENT_SESSION_LIFETIME;
+                           login moves it to a fresh sid
+    rev:<store path>       revision counter of a data store, INCRed by every save
+    invalidate             channel carrying {'node', 'path', 'rev'} after every save
+    idempotency:<key>      JSON {'body', 'status'} of a successful POST replayed for a
+                           retried Idempotency-Key, expiring after IDEMPOTENCY_TTL
+"""
+
+import json
+import queue
+import threading
+import time
+import uuid
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+INVALIDATE_CHANNEL = 'invalidate'
+SESSION_PREFIX = 'session:'
+REVISION_PREFIX = 'rev:'
+IDEMPOTENCY_PREFIX = 'idempotency:'
+
+class MemoryRedis:
+    """The subset of the redis-py client API used by the app, kept in process memory"""
+
+    def __init__(self):
+        self._data = {}
+        self._expiry = {}
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        expires = self._expiry.get(name)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(name, None)
+            self._expiry.pop(name, None)
+        return name in self._data
+
+    def get(self, name):
+        with self._lock:
+            return self._data[name] if self._live(name) else None
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = value if isinstance(value, bytes) else str(value).encode()
+            if ex:
+                self._expiry[name] = time.monotonic() + ex
+            else:
+                self._expiry.pop(name, None)
+        return True
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = sum(1 for name in names if self._live(name))
+            for name in names:
+                self._data.pop(name, None)
+                self._expiry.pop(name, None)
+        return deleted
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            value = int(self._data[name]) + amount if self._live(name) else amount
+            self._data[name] = str(value).encode()
+        return value
+
+    def publish(self, channel, message):
+        message = message if isinstance(message, bytes) else str(message).encode()
+        with self._lock:
+            subscribers = [s for s in self._subscribers if channel in s.channels]
+        for subscriber in subscribers:
+            subscriber.messages.put({'type': 'message', 'channel': channel.encode(), 'data': message})
+        return len(subscribers)
+
+    def pubsub(self):
+        subscriber = MemoryPubSub(self)
+        with self._lock:
+            self._subscribers.append(subscriber)
+        return subscriber
+
+class MemoryPubSub:
+    """A MemoryRedis subscription with the redis-py PubSub polling API"""
+
+    def __init__(self, server):
+        self.server = server
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout) if timeout else self.messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        with self.server._lock:
+            if self in self.server._subscribers:
+                self.server._subscribers.remove(self)
+
+_memory_servers = {}
+_memory_servers_lock = threading.Lock()
+
+def connect(url):
+    """Return a Redis-compatible client for a redis:// or memory:// URL"""
+    if url.startswith('memory://'):
+        with _memory_servers_lock:
+            return _memory_servers.setdefault(url, MemoryRedis())
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(f"SHARED_BACKEND_URL is {url} but the redis package is not installed")
+    return redis.Redis.from_url(url)
+
+class SharedSession(CallbackDict, SessionMixin):
+    """Session data stored server-side under its session ID"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.replaced_sid = None
+
+    def regenerate(self):
+        """Move the session to a fresh ID, e.g. on login against session fixation"""
+        if self.replaced_sid is None and not self.new:
+            self.replaced_sid = self.sid
+        self.sid = uuid.uuid4().hex
+        self.modified = True
+
+class SharedSessionInterface(SessionInterface):
+    """Keep sessions in the shared backend; the cookie only carries a signed session ID"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get_signer(self, app):
+        return Signer(app.secret_key, salt='shared-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self.get_signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            raw = self.client.get(SESSION_PREFIX + sid) if sid else None
+            if raw is not None:
+                return SharedSession(json.loads(raw), sid=sid)
+        return SharedSession(sid=uuid.uuid4().hex, new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.replaced_sid:
+            self.client.delete(SESSION_PREFIX + session.replaced_sid)
+        if not session:
+            if session.modified:
+                self.client.delete(SESSION_PREFIX + session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+        response.vary.add('Cookie')
+        if not self.should_set_cookie(app, session):
+            return
+        lifetime = int(app.permanent_session_lifetime.total_seconds())
+        self.client.set(SESSION_PREFIX + session.sid, json.dumps(dict(session)), ex=lifetime)
+        response.set_cookie(
+            name,
+            self.get_signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
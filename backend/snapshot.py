@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Binary snapshots of the data stores
+
+A snapshot holds every store (students, users, attendance, face data) in one
+file so a worker can start without parsing the JSON files, and so a
+multi-year dataset can be backed up or restored in seconds. JSON stays the
+interchange format: restoring a snapshot rewrites the JSON files.
+
+File layout: a fixed header followed by the payload.
+
+    magic          6 bytes   b'SRSNAP'
+    version        uint16    FORMAT_VERSION
+    marshal        uint16    marshal.version of the writer
+    flags          uint16    FLAG_COMPRESSED if the payload is zlib-compressed
+    length         uint64    payload length in bytes
+    checksum       32 bytes  SHA-256 of the payload
+
+The payload is a marshalled dict {'created_at': str, 'stores': {name: entry}}
+where each entry is {'stamp': [mtime_ns, size], 'digest': sha256 of the JSON
+file, 'data': marshalled store contents}.
+
+Usage:
+    python snapshot.py export backups/2025-09-01.snap [--compress]
+    python snapshot.py restore backups/2025-09-01.snap
+    python snapshot.py info backups/2025-09-01.snap
+"""
+
+import argparse
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+
+MAGIC = b'SRSNAP'
+FORMAT_VERSION = 1
+FLAG_COMPRESSED = 1
+HEADER = struct.Struct('<6sHHHQ32s')
+
+def encode_snapshot(stores, compress=False):
+    """Encode store entries into snapshot bytes"""
+    payload = marshal.dumps({'created_at': datetime.now().isoformat(), 'stores': stores})
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 6)
+        flags |= FLAG_COMPRESSED
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, marshal.version, flags, len(payload),
+                         hashlib.sha256(payload).digest())
+    return header + payload
+
+def decode_snapshot(buffer):
+    """Decode snapshot bytes (or an mmap), raising ValueError if they are invalid"""
+    if len(buffer) < HEADER.size:
+        raise ValueError('Snapshot is truncated')
+    magic, version, marshal_version, flags, length, checksum = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('Not a snapshot file')
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported snapshot version {version}')
+    if marshal_version > marshal.version:
+        raise ValueError(f'Snapshot was written with a newer Python (marshal version {marshal_version})')
+    payload = memoryview(buffer)[HEADER.size:HEADER.size + length]
+    try:
+        if len(payload) != length:
+            raise ValueError('Snapshot is truncated')
+        if hashlib.sha256(payload).digest() != checksum:
+            raise ValueError('Snapshot checksum mismatch')
+        if flags & FLAG_COMPRESSED:
+            return marshal.loads(zlib.decompress(payload))
+        return marshal.loads(payload)
+    finally:
+        payload.release()
+
+def write_snapshot(path, stores, compress=False):
+    """Atomically write store entries to a snapshot file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(encode_snapshot(stores, compress))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def read_snapshot(path):
+    """Read a snapshot file with a single mmap"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError('Snapshot is empty')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return decode_snapshot(buffer)
+
+def main():
+    parser = argparse.ArgumentParser(description='Export, restore or inspect data store snapshots')
+    parser.add_argument('command', choices=['export', 'restore', 'info'])
+    parser.add_argument('path', help='snapshot file')
+    parser.add_argument('--data-dir', help='directory holding the JSON stores (default: current directory)')
+    parser.add_argument('--compress', action='store_true', help='zlib-compress the exported snapshot')
+    args = parser.parse_args()
+
+    import app
+    if args.data_dir:
+        app.DATA_DIR = args.data_dir
+
+    try:
+        if args.command == 'export':
+            count = app.write_data_snapshot(args.path, compress=args.compress)
+            print(f"✅ Exported {count} stores to {args.path} ({os.path.getsize(args.path)} bytes)")
+        elif args.command == 'restore':
+            count = app.restore_data_snapshot(args.path)
+            print(f"✅ Restored {count} stores from {args.path}")
+        else:
+            contents = read_snapshot(args.path)
+            print(f"Snapshot created at {contents['created_at']}")
+            for name, entry in sorted(contents['stores'].items()):
+                print(f"  {name}: {len(entry['data'])} bytes (JSON sha256 {entry['digest'][:12]})")
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -44,8 +44,8 @@ def main():
     Timer(3, open_browser).start()
     
     # Import and run the Flask app
-    from app import app
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    from app import create_app
+    create_app().run(debug=True, host='0.0.0.0', port=5000)
 
 if __name__ == "__main__":
     try:
@@ -1,11 +1,14 @@
 // Students List JavaScript
 let students = [];
 let currentView = 'table';
+let changeSeq = null;  // change feed position the list is synced to
+const SYNC_INTERVAL = 30000;
 
 // Initialize the page
 document.addEventListener('DOMContentLoaded', function() {
     loadStudents();
     setupEventListeners();
+    setInterval(syncStudents, SYNC_INTERVAL);
 });
 
 // Setup event listeners
@@ -39,6 +42,9 @@ function setupEventListeners() {
 // Load students from the server
 async function loadStudents() {
     try {
+        // Take the feed position first, so changes made during the load are replayed
+        const changes = await fetch('/api/changes');
+        changeSeq = changes.ok ? (await changes.json()).seq : null;
         const response = await fetch('/api/students');
         if (response.ok) {
             students = await response.json();
@@ -52,6 +58,39 @@ async function loadStudents() {
     }
 }
 
+// Apply changes made since the last sync, reloading if the feed cannot provide them
+async function syncStudents() {
+    if (changeSeq === null) {
+        return loadStudents();
+    }
+    try {
+        const response = await fetch(`/api/changes?since=${changeSeq}`);
+        if (!response.ok) {
+            return loadStudents();
+        }
+        const feed = await response.json();
+        let changed = false;
+        feed.changes.forEach(change => {
+            if (change.store !== 'students') return;
+            const index = students.findIndex(s => s.id === change.id);
+            if (change.op === 'delete') {
+                if (index !== -1) students.splice(index, 1);
+            } else if (index !== -1) {
+                students[index] = { ...students[index], ...change.data };
+            } else {
+                students.push(change.data);
+            }
+            changed = true;
+        });
+        changeSeq = feed.seq;
+        if (changed) {
+            renderStudents();
+        }
+    } catch (error) {
+        console.error('Error syncing students:', error);
+    }
+}
+
 // Render students in current view
 function renderStudents() {
     if (currentView === 'table') {
@@ -207,7 +246,7 @@ async function updateStudent() {
         if (response.ok) {
             showNotification('Student updated successfully', 'success');
             closeEditStudentModal();
-            loadStudents();
+            syncStudents();
         } else {
             const error = await response.json();
             showNotification(error.message || 'Failed to update student', 'error');
@@ -235,7 +274,7 @@ async function deleteStudent(studentId) {
         if (response.ok) {
             showNotification('Student deleted successfully', 'success');
             closeDeleteStudentModal();
-            loadStudents();
+            syncStudents();
         } else {
             const error = await response.json();
             showNotification(error.message || 'Failed to delete student', 'error');
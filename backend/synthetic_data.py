@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Synthetic school dataset generator for benchmarks and load tests
+
+Writes students.json, users.json, attendance.json and face_data.json in the
+same format the app uses. Attendance covers school days (Monday to Friday)
+up to yesterday, so a check-in run against the dataset marks fresh records.
+
+Usage:
+    python synthetic_data.py bench_data --students 5000 --years 2
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+FIRST_NAMES = ['Aarav', 'Diya', 'Ishaan', 'Ananya', 'Kabir', 'Meera', 'Rohan', 'Saanvi', 'Vihaan', 'Zara',
+               'Arjun', 'Kiara', 'Aditya', 'Myra', 'Reyansh', 'Aisha', 'Dev', 'Tara', 'Neil', 'Riya']
+LAST_NAMES = ['Sharma', 'Patel', 'Gupta', 'Singh', 'Kumar', 'Reddy', 'Iyer', 'Nair', 'Das', 'Mehta',
+              'Joshi', 'Rao', 'Bose', 'Khan', 'Verma', 'Chopra', 'Malhotra', 'Kapoor', 'Sen', 'Pillai']
+STUDENTS_PER_CLASS = 40
+ROLL_PREFIX = '2024'
+
+def roll_number(student_id, students):
+    """Roll number of a student, zero-padded to fit the largest ID of the dataset
+
+    Three digits, like the app, up to 999 students; larger datasets get wider
+    numbers so every roll number keeps the same length.
+    """
+    return f"{ROLL_PREFIX}{student_id:0{max(3, len(str(students)))}d}"
+
+def class_names(students):
+    """Class names for a school of the given size, e.g. 1A, 1B, ..., 12D"""
+    count = max(1, -(-students // STUDENTS_PER_CLASS))
+    sections = max(1, -(-count // 12))
+    names = [f"{grade}{chr(ord('A') + s)}" for s in range(sections) for grade in range(1, 13)]
+    return names[:count]
+
+def school_days(years, end_date):
+    """School days (Mon-Fri) in the given number of years before end_date, oldest first"""
+    day = end_date - timedelta(days=int(365 * years))
+    while day < end_date:
+        if day.weekday() < 5:
+            yield day
+        day += timedelta(days=1)
+
+def make_users(classes):
+    users = {
+        'principal': {
+            'username': 'principal',
+            'password': hashlib.sha256('principal123'.encode()).hexdigest(),
+            'role': 'principal',
+            'name': 'Principal'
+        }
+    }
+    for i in range(1, max(2, len(classes) // 2) + 1):
+        users[f'teacher{i}'] = {
+            'username': f'teacher{i}',
+            'password': hashlib.sha256('teacher123'.encode()).hexdigest(),
+            'role': 'teacher',
+            'name': f'Teacher {i}'
+        }
+    return users
+
+def make_students(count, classes, users, rng):
+    creators = [u['name'] for u in users.values()]
+    students = []
+    for i in range(1, count + 1):
+        dob = date(2006, 1, 1) + timedelta(days=rng.randrange(12 * 365))
+        created = datetime(2024, 6, 1) + timedelta(minutes=rng.randrange(60 * 24 * 90))
+        creator = rng.choice(creators)
+        students.append({
+            'id': i,
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+            'dob': dob.isoformat(),
+            'class': classes[(i - 1) // STUDENTS_PER_CLASS % len(classes)],
+            'roll_number': roll_number(i, count),
+            'created_at': created.isoformat(),
+            'created_by': creator,
+            'created_by_role': 'principal' if creator == 'Principal' else 'teacher'
+        })
+    return students
+
+def write_attendance(path, students, years, attendance_rate, end_date, rng):
+    """Stream attendance to disk one day at a time so large datasets fit in memory"""
+    records = 0
+    with open(path, 'w') as f:
+        f.write('{')
+        for n, day in enumerate(school_days(years, end_date)):
+            day_records = {}
+            for student in students:
+                if rng.random() < attendance_rate:
+                    marked = datetime.combine(day, datetime.min.time()) + timedelta(hours=7, minutes=rng.randrange(90))
+                    day_records[str(student['id'])] = {
+                        'status': 'present',
+                        'timestamp': marked.isoformat(),
+                        'method': 'face_recognition'
+                    }
+            records += len(day_records)
+            f.write(f"{',' if n else ''}\n  {json.dumps(day.isoformat())}: {json.dumps(day_records)}")
+        f.write('\n}\n')
+    return records
+
+def make_face_data(students, enrolled_fraction, rng):
+    return {
+        s['roll_number']: {'registered_at': s['created_at'], 'face_detected': True, 'frames': 1}
+        for s in students if rng.random() < enrolled_fraction
+    }
+
+def generate_dataset(data_dir, students=500, years=1, attendance_rate=0.9, enrolled_fraction=0.8,
+                     seed=42, end_date=None):
+    """Write a synthetic dataset to data_dir and return a summary of what was generated"""
+    rng = random.Random(seed)
+    end_date = end_date or date.today()
+    os.makedirs(data_dir, exist_ok=True)
+    classes = class_names(students)
+    users = make_users(classes)
+    student_list = make_students(students, classes, users, rng)
+    face_data = make_face_data(student_list, enrolled_fraction, rng)
+
+    with open(os.path.join(data_dir, 'users.json'), 'w') as f:
+        json.dump(users, f, indent=2)
+    with open(os.path.join(data_dir, 'students.json'), 'w') as f:
+        json.dump(student_list, f, indent=2)
+    with open(os.path.join(data_dir, 'face_data.json'), 'w') as f:
+        json.dump(face_data, f, indent=2)
+    records = write_attendance(os.path.join(data_dir, 'attendance.json'), student_list, years,
+                               attendance_rate, end_date, rng)
+    return {
+        'students': students,
+        'years': years,
+        'classes': classes,
+        'teachers': [u for u in users if users[u]['role'] == 'teacher'],
+        'face_enrolled': len(face_data),
+        'attendance_records': records,
+        'seed': seed
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic school dataset')
+    parser.add_argument('data_dir', help='directory to write the JSON stores to')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--years', type=float, default=1, help='years of attendance history')
+    parser.add_argument('--attendance-rate', type=float, default=0.9)
+    parser.add_argument('--enrolled', type=float, default=0.8, help='fraction of students with face data')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    summary = generate_dataset(args.data_dir, args.students, args.years, args.attendance_rate,
+                               args.enrolled, args.seed)
+    print(f"✅ {summary['students']} students in {len(summary['classes'])} classes, "
+          f"{summary['attendance_records']} attendance records, {summary['face_enrolled']} face enrollments "
+          f"written to {args.data_dir}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Image admission control: limits leave worker threads free for lightweight
+endpoints, excess requests are shed with 503 + Retry-After, and both shed
+counters are kept
+"""
+
+import threading
+import time
+
+import pytest
+
+import app as app_module
+
+@pytest.fixture
+def slow_app(app_config, monkeypatch):
+    """An app with one slot (1 running, 1 queued) and a /slow image endpoint held until released"""
+    monkeypatch.setattr(app_module, 'IMAGE_MAX_IN_FLIGHT', 1)
+    monkeypatch.setattr(app_module, 'IMAGE_QUEUE_TIMEOUT', 5)
+    flask_app = app_module.create_app({**app_config, 'WORKER_THREADS': 4})
+    flask_app.release = threading.Event()
+    flask_app.started = threading.Event()
+
+    def slow():
+        flask_app.started.set()
+        flask_app.release.wait(5)
+        return 'done'
+    flask_app.add_url_rule('/slow', 'slow', app_module.image_admission(slow))
+    return flask_app
+
+def request_in_thread(flask_app, results):
+    thread = threading.Thread(target=lambda: results.append(flask_app.test_client().get('/slow')))
+    thread.start()
+    return thread
+
+def stats():
+    with app_module._admission_cond:
+        return dict(app_module._admission_stats)
+
+@pytest.mark.parametrize('threads, limits', [
+    (None, (4, 8)),   # unbounded (dev server): the configured limits
+    (32, (4, 8)),
+    (12, (4, 6)),     # 4 running + 6 waiting leave 2 of 12 threads free
+    (5, (3, 0)),
+    (1, (1, 0)),      # sync worker
+])
+def test_limits_leave_threads_free(app_config, threads, limits):
+    flask_app = app_module.create_app({**app_config, 'WORKER_THREADS': threads})
+    with flask_app.app_context():
+        assert app_module.admission_limits() == limits
+
+def test_queue_full_is_shed_at_once(slow_app):
+    before = stats()
+    results = []
+    running = request_in_thread(slow_app, results)
+    assert slow_app.started.wait(5)
+    queued = request_in_thread(slow_app, results)
+    while stats()['queued'] < before['queued'] + 1:
+        time.sleep(0.01)
+    response = slow_app.test_client().get('/slow')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(app_module.IMAGE_RETRY_AFTER)
+    slow_app.release.set()
+    running.join()
+    queued.join()
+    assert sorted(r.status_code for r in results) == [200, 200]
+    after = stats()
+    assert after['shed_queue_full'] == before['shed_queue_full'] + 1
+    assert after['admitted'] == before['admitted'] + 2
+
+def test_queue_timeout_is_shed(slow_app, monkeypatch):
+    monkeypatch.setattr(app_module, 'IMAGE_QUEUE_TIMEOUT', 0.2)
+    before = stats()
+    results = []
+    running = request_in_thread(slow_app, results)
+    assert slow_app.started.wait(5)
+    response = slow_app.test_client().get('/slow')
+    assert response.status_code == 503
+    assert 'Retry-After' in response.headers
+    slow_app.release.set()
+    running.join()
+    after = stats()
+    assert after['shed_timeout'] == before['shed_timeout'] + 1
+    assert after['in_flight'] == before['in_flight'] and after['queued'] == before['queued']
+
+def test_admission_metrics_report_limits(app_config):
+    flask_app = app_module.create_app({**app_config, 'WORKER_THREADS': 12})
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    body = client.get('/api/metrics/admission').get_json()
+    assert (body['max_in_flight'], body['max_queue']) == (4, 6)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+ASGI adapter: open streams must not hold the request thread pool, streams
+are read in one thread (as stream_with_context requires) and closed when
+the client disconnects, and importing the adapter builds no app
+"""
+
+import asyncio
+import threading
+
+from flask import Flask, request, stream_with_context
+
+import asgi
+from asgi import AsgiAdapter
+
+def make_app(release, closed):
+    app = Flask(__name__)
+
+    @app.route('/stream')
+    def stream():
+        @stream_with_context
+        def generate():
+            try:
+                yield 'first\n'
+                release.wait(5)
+                # The request context must still be there after a yield
+                yield f"{request.args.get('n')}\n"
+            finally:
+                closed.append(True)
+        return app.response_class(generate(), mimetype='text/plain')
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    return app
+
+def scope(path, query=b''):
+    return {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': []}
+
+class Client:
+    """One ASGI connection: a request with an empty body, then an optional disconnect"""
+
+    def __init__(self):
+        self.messages = []
+        self.disconnect = asyncio.Event()
+        self.sent_request = False
+
+    async def receive(self):
+        if not self.sent_request:
+            self.sent_request = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    def body(self):
+        return b''.join(m.get('body', b'') for m in self.messages if m['type'] == 'http.response.body')
+
+def test_open_streams_leave_the_pool_free():
+    release, closed = threading.Event(), []
+    adapter = AsgiAdapter(make_app(release, closed), threads=2)
+
+    async def run():
+        streams = [Client() for _ in range(6)]
+        tasks = [asyncio.ensure_future(adapter(scope('/stream', f"n={i}".encode()), c.receive, c.send))
+                 for i, c in enumerate(streams)]
+        await asyncio.sleep(0.2)
+        ping = Client()
+        await asyncio.wait_for(adapter(scope('/ping'), ping.receive, ping.send), timeout=2)
+        release.set()
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+        return ping, streams
+
+    ping, streams = asyncio.run(run())
+    assert ping.body() == b'pong'
+    assert [c.body() for c in streams] == [f"first\n{i}\n".encode() for i in range(6)]
+    assert len(closed) == 6
+
+def test_disconnect_closes_the_stream():
+    release, closed = threading.Event(), []
+    adapter = AsgiAdapter(make_app(release, closed), threads=2)
+
+    async def run():
+        client = Client()
+        task = asyncio.ensure_future(adapter(scope('/stream'), client.receive, client.send))
+        await asyncio.sleep(0.2)
+        client.disconnect.set()
+        await asyncio.wait_for(task, timeout=2)
+        release.set()
+        return client
+
+    client = asyncio.run(run())
+    assert client.body() == b'first\n'
+    for _ in range(50):
+        if closed:
+            break
+        threading.Event().wait(0.02)
+    assert closed == [True]
+
+def test_import_builds_no_app():
+    # asgi:app is built on first lookup, so the import above started nothing
+    assert 'app' not in vars(asgi)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Live class attendance boards: a stream opens with a snapshot of the class,
+then carries attendance and removal events for that class only, and
+unsubscribes when it is closed
+"""
+
+import json
+from datetime import date
+
+import pytest
+
+import app as app_module
+
+STUDENTS = [{'id': 1, 'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A', 'roll_number': '2024001'},
+            {'id': 2, 'name': 'Ravi Kumar', 'dob': '2012-05-06', 'class': '6B', 'roll_number': '2024002'},
+            {'id': 3, 'name': 'Meera Nair', 'dob': '2012-07-08', 'class': '5A', 'roll_number': '2024003'}]
+
+@pytest.fixture
+def client(flask_app):
+    with flask_app.app_context():
+        app_module.save_students(STUDENTS)
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    return client
+
+def read_event(chunks):
+    """Parse the next SSE message from the stream into (event, data)"""
+    lines = next(chunks).decode().strip().splitlines()
+    fields = dict(line.split(': ', 1) for line in lines)
+    return fields['event'], json.loads(fields['data'])
+
+def test_stream_carries_snapshot_and_events(flask_app, client):
+    response = client.get('/api/attendance/class/5A/stream', buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    try:
+        event, snapshot = read_event(chunks)
+        assert event == 'snapshot'
+        assert snapshot['class'] == '5A'
+        assert [(a['student']['id'], a['today_status']) for a in snapshot['attendance']] == [(1, 'absent'), (3, 'absent')]
+        
+        with flask_app.app_context():
+            app_module.mark_attendance(2)  # class 6B, not on this board
+            app_module.mark_attendance(3)
+        event, data = read_event(chunks)
+        assert event == 'attendance'
+        assert (data['student_id'], data['date'], data['status']) == (3, date.today().isoformat(), 'present')
+        
+        today = date.today().isoformat()
+        assert client.delete(f'/api/attendance/remove/3/{today}').status_code == 200
+        assert read_event(chunks) == ('removal', {'student_id': 3, 'date': today})
+    finally:
+        response.close()
+    assert not app_module._board_subscribers
+
+def test_stream_requires_teacher(flask_app):
+    assert flask_app.test_client().get('/api/attendance/class/5A/stream').status_code == 401
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Group commit of attendance marks: concurrent marks share writes, large
+bursts are split into ATTENDANCE_MAX_BATCH batches, and a failed write
+is raised in every request of its batch
+"""
+
+import os
+import stat
+import threading
+import time
+from datetime import date
+
+import pytest
+
+import app as app_module
+
+MARKS = 24
+
+@pytest.fixture
+def flask_app(flask_app, monkeypatch):
+    monkeypatch.setattr(app_module, 'ATTENDANCE_COMMIT_WINDOW', 0.05)
+    return flask_app
+
+def mark_concurrently(flask_app, student_ids):
+    """Mark every student from its own thread and return {student_id: record or exception}"""
+    results = {}
+    start = threading.Barrier(len(student_ids))
+
+    def mark(student_id):
+        with flask_app.app_context():
+            start.wait()
+            try:
+                results[student_id] = app_module.mark_attendance(student_id)
+            except Exception as e:
+                results[student_id] = e
+
+    threads = [threading.Thread(target=mark, args=(student_id,)) for student_id in student_ids]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def stored_marks(flask_app):
+    with flask_app.app_context():
+        return app_module.load_attendance().get(date.today().isoformat(), {})
+
+def test_concurrent_marks_share_commits(flask_app):
+    commits = app_module.ATTENDANCE_COMMITS.get()
+    results = mark_concurrently(flask_app, range(1, MARKS + 1))
+    assert all(isinstance(record, dict) for record in results.values())
+    assert sorted(stored_marks(flask_app)) == sorted(str(i) for i in range(1, MARKS + 1))
+    assert app_module.ATTENDANCE_COMMITS.get() - commits < MARKS
+
+def test_bursts_split_into_max_batches(flask_app, monkeypatch):
+    monkeypatch.setattr(app_module, 'ATTENDANCE_MAX_BATCH', 5)
+    commits = app_module.ATTENDANCE_COMMITS.get()
+    mark_concurrently(flask_app, range(1, MARKS + 1))
+    assert len(stored_marks(flask_app)) == MARKS
+    assert app_module.ATTENDANCE_COMMITS.get() - commits >= -(-MARKS // 5)
+
+def test_write_error_reaches_every_waiter(flask_app, monkeypatch):
+    def fail(attendance):
+        raise OSError('disk full')
+    monkeypatch.setattr(app_module, 'save_attendance', fail)
+    results = mark_concurrently(flask_app, range(1, MARKS + 1))
+    assert all(isinstance(error, OSError) for error in results.values())
+    monkeypatch.undo()
+    # The failed batch leaves no leader behind: later marks still commit
+    monkeypatch.setattr(app_module, 'ATTENDANCE_COMMIT_WINDOW', 0.0)
+    assert mark_concurrently(flask_app, [1])[1]['status'] == 'present'
+
+def test_removal_keeps_concurrent_marks(flask_app, monkeypatch):
+    mark_concurrently(flask_app, [1])
+    load_attendance = app_module.load_attendance
+    removing = threading.Event()
+
+    def slow_load():
+        # Give the marks below time to commit between the removal's load and save
+        attendance = load_attendance()
+        if threading.current_thread().name == 'remover':
+            removing.set()
+            time.sleep(0.3)
+        return attendance
+    monkeypatch.setattr(app_module, 'load_attendance', slow_load)
+
+    def remove():
+        with flask_app.test_request_context():
+            app_module.session['user'] = {'username': 'principal', 'name': 'Principal', 'role': 'principal'}
+            app_module.remove_attendance(1, date.today().isoformat())
+
+    remover = threading.Thread(target=remove, name='remover')
+    remover.start()
+    removing.wait()
+    mark_concurrently(flask_app, range(2, MARKS + 1))
+    remover.join()
+    assert sorted(stored_marks(flask_app), key=int) == [str(i) for i in range(2, MARKS + 1)]
+
+def test_store_writes_sync_the_directory(flask_app, monkeypatch):
+    synced = []
+    fsync = os.fsync
+
+    def record_fsync(fd):
+        synced.append(stat.S_ISDIR(os.fstat(fd).st_mode))
+        fsync(fd)
+    monkeypatch.setattr(app_module.os, 'fsync', record_fsync)
+    with flask_app.app_context():
+        app_module.write_store('attendance', {})
+    # The file, then the directory holding its new name
+    assert synced == [False, True]
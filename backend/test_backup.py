@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Online backups: unchanged stores are reused by SHA-256, restores rewrite the
+stores, writes made after the hard-link step stay out of the backup, and
+pruning keeps the objects newer backups still reference
+"""
+
+import json
+import os
+
+import pytest
+
+import app as app_module
+import backup
+
+STUDENT = {'id': 1, 'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A', 'roll_number': '2024001'}
+
+@pytest.fixture
+def backup_dir(tmp_path):
+    return str(tmp_path / 'backups')
+
+@pytest.fixture
+def app_context(flask_app):
+    with flask_app.app_context():
+        app_module.save_students([STUDENT])
+        yield
+
+def objects(backup_dir):
+    return sorted(os.listdir(os.path.join(backup_dir, 'objects')))
+
+def test_unchanged_stores_are_reused(app_context, backup_dir):
+    _, first = app_module.create_backup(backup_dir)
+    stored = objects(backup_dir)
+    _, second = app_module.create_backup(backup_dir)
+    assert second['stores'] == first['stores']
+    assert objects(backup_dir) == stored
+    assert len(stored) == len({entry['sha256'] for entry in first['stores'].values()})
+
+def test_only_changed_stores_get_new_objects(app_context, backup_dir):
+    _, first = app_module.create_backup(backup_dir)
+    stored = objects(backup_dir)
+    app_module.save_students([STUDENT, {**STUDENT, 'id': 2, 'roll_number': '2024002'}])
+    _, second = app_module.create_backup(backup_dir)
+    assert second['stores']['students']['sha256'] != first['stores']['students']['sha256']
+    unchanged = {name for name in first['stores'] if name != 'students'}
+    assert {name: second['stores'][name] for name in unchanged} == {name: first['stores'][name] for name in unchanged}
+    assert set(objects(backup_dir)) - set(stored) == {f"{second['stores']['students']['sha256']}.json.gz"}
+
+def test_restore_rewrites_the_stores(app_context, backup_dir):
+    backup_id, manifest = app_module.create_backup(backup_dir)
+    app_module.save_students([])
+    assert app_module.restore_backup(backup_id, backup_dir) == len(manifest['stores'])
+    assert app_module.load_students() == [STUDENT]
+
+def test_restore_of_a_missing_backup_fails(app_context, backup_dir):
+    with pytest.raises(ValueError):
+        app_module.restore_backup('20250901T080000000000', backup_dir)
+    assert app_module.load_students() == [STUDENT]
+
+def test_write_after_linking_stays_out_of_the_backup(app_context, backup_dir, monkeypatch):
+    write_backup = backup.write_backup
+
+    def write_after_linking(target_dir, files):
+        # The write lock is released by now; a writer replaces students.json
+        app_module.save_students([])
+        return write_backup(target_dir, files)
+    monkeypatch.setattr(backup, 'write_backup', write_after_linking)
+
+    backup_id, _ = app_module.create_backup(backup_dir)
+    assert app_module.load_students() == []
+    assert json.loads(backup.read_backup(backup_dir, backup_id)['students']) == [STUDENT]
+
+def test_prune_keeps_objects_of_newer_backups(app_context, backup_dir):
+    oldest_id, oldest = app_module.create_backup(backup_dir)
+    app_module.save_students([])
+    app_module.create_backup(backup_dir)
+    newest_id, newest = app_module.create_backup(backup_dir)
+    assert backup.prune_backups(backup_dir, 2) == 1
+    assert oldest_id not in [backup_id for backup_id, _ in backup.list_backups(backup_dir)]
+    referenced = {f"{entry['sha256']}.json.gz" for entry in newest['stores'].values()}
+    assert set(objects(backup_dir)) == referenced
+    assert f"{oldest['stores']['students']['sha256']}.json.gz" not in referenced
+    assert json.loads(backup.read_backup(backup_dir, newest_id)['students']) == []
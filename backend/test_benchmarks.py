@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Regression benchmarks for the data-layer helpers in app.py
+
+Each helper runs against a synthetic dataset (see synthetic_data.py) and its
+time per call is divided by the time of a fixed pure-Python calibration
+workload measured in the same run. These scores barely depend on the
+machine, so one baseline in benchmark_baseline.json serves laptops and CI.
+A benchmark fails when its score exceeds the baseline by more than
+BENCHMARK_TOLERANCE (default 1.5x).
+
+Usage:
+    python -m pytest -q test_benchmarks.py
+    python test_benchmarks.py                     # print scores against the baseline
+    python test_benchmarks.py --update-baseline   # accept the current scores
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import statistics
+import tempfile
+import timeit
+from datetime import date
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BACKEND_DIR, 'benchmark_baseline.json')
+TOLERANCE = float(os.environ.get('BENCHMARK_TOLERANCE', 1.5))
+
+# Scaled fixture: close to the 999 student ceiling, a full year of attendance
+STUDENTS = 900
+YEARS = 1
+END_DATE = date(2025, 6, 30)
+ROUNDS = 9
+MIN_RUN_SECONDS = 0.05
+
+def calibration_workload():
+    """Fixed mix of the dict, string and sort work the helpers do"""
+    records = {str(i): {'name': f"Student {i}", 'status': 'present'} for i in range(2000)}
+    return sorted(k for k, v in records.items() if 'ent 1' in v['name'].lower())
+
+def calibrated_timer(func):
+    """Return (timer, number) so one run of func takes at least MIN_RUN_SECONDS"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    return timer, max(number, int(number * MIN_RUN_SECONDS / elapsed) if elapsed else number)
+
+def score(func, calibration):
+    """Median over ROUNDS of func's time per call relative to the calibration workload
+
+    Each round times the calibration right before func, so a slowdown of the
+    whole machine affects both sides of the ratio.
+    """
+    timer, number = calibrated_timer(func)
+    ratios = []
+    for _ in range(ROUNDS):
+        baseline = calibration[0].timeit(calibration[1]) / calibration[1]
+        ratios.append(timer.timeit(number) / number / baseline)
+    return statistics.median(ratios)
+
+def make_benchmarks(app_module):
+    """Map benchmark names to zero-argument callables over the loaded dataset"""
+    students = app_module.load_students()
+    student_id = students[len(students) // 2]['id']
+    dobs = [s.get('dob') for s in students]
+    creators = [s.get('created_by') for s in students]
+    users = app_module.load_users()
+    entry = app_module.get_student_views()
+    return {
+        'generate_roll_number': app_module.generate_roll_number,
+        'get_attendance_for_student': lambda: app_module.get_attendance_for_student(student_id),
+        'filter_students': lambda: app_module.filter_students(app_module.load_students(), 'nair'),
+        'calculate_age': lambda: [app_module.calculate_age(dob) for dob in dobs],
+        'resolve_username_to_name': lambda: [app_module.resolve_username_to_name(u) for u in creators],
+        'build_student_views': lambda: app_module.build_student_views(students, users, END_DATE),
+        'query_students': lambda: app_module.query_students(
+            entry, dob_from=date(2008, 1, 1), dob_to=date(2016, 12, 31), created_by=students[0]['created_by']),
+    }
+
+def run_benchmarks(data_dir):
+    """Build the fixture in data_dir, time each benchmark and return {name: score}"""
+    sys.path.insert(0, BACKEND_DIR)
+    import app as app_module
+    import synthetic_data
+    synthetic_data.generate_dataset(data_dir, students=STUDENTS, years=YEARS, end_date=END_DATE)
+    flask_app = app_module.create_app({'DATA_DIR': data_dir, 'LOG_FILE': None, 'SNAPSHOT_FILE': None})
+    # INFO logging depends on how the root logger was configured (pytest
+    # captures it), so it is left out of the measurement
+    logging.disable(logging.INFO)
+    try:
+        with flask_app.app_context():
+            benchmarks = make_benchmarks(app_module)
+            calibration = calibrated_timer(calibration_workload)
+            return {name: score(func, calibration) for name, func in benchmarks.items()}
+    finally:
+        logging.disable(logging.NOTSET)
+
+def load_baseline():
+    """Stored scores by benchmark name, empty until --update-baseline has run"""
+    if not os.path.exists(BASELINE_FILE):
+        return {}
+    with open(BASELINE_FILE) as f:
+        return json.load(f)['scores']
+
+@pytest.fixture(scope='module')
+def scores(tmp_path_factory):
+    return run_benchmarks(str(tmp_path_factory.mktemp('benchmarks')))
+
+@pytest.mark.parametrize('name', sorted(load_baseline()))
+def test_no_regression(scores, name):
+    baseline = load_baseline()[name]
+    assert scores[name] <= baseline * TOLERANCE, (
+        f"{name} scored {scores[name]:.2f}, baseline {baseline:.2f} (tolerance {TOLERANCE}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the data-layer benchmarks')
+    parser.add_argument('--update-baseline', action='store_true', help='store the current scores as the baseline')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix='benchmarks-') as data_dir:
+        scores = run_benchmarks(data_dir)
+    baseline = load_baseline()
+    for name, value in scores.items():
+        previous = baseline.get(name)
+        change = f"{value / previous:.2f}x baseline" if previous else 'no baseline'
+        print(f"{name:28s} {value:10.3f}  ({change})")
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w') as f:
+            json.dump({'students': STUDENTS, 'years': YEARS,
+                       'scores': {name: round(value, 3) for name, value in scores.items()}}, f, indent=2)
+            f.write('\n')
+        print(f"Baseline written to {BASELINE_FILE}")
+
+if __name__ == "__main__":
+    main()
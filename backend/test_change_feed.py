@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Change feed: records follow the order of the writes, the log rotates at
+CHANGE_FEED_SIZE, and writes that never reached the log force a resync
+"""
+
+import json
+import threading
+
+import pytest
+
+import app as app_module
+
+def principal_client(flask_app):
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    return client
+
+def add_student(client, name):
+    return client.post('/api/students', json={'name': name, 'dob': '2012-03-04', 'class': '5A'}).get_json()
+
+def test_feed_ends_on_the_stored_data(flask_app):
+    client = principal_client(flask_app)
+    student = add_student(client, 'Asha Rao')
+    seq = client.get('/api/changes').get_json()['seq']
+
+    def update(i):
+        principal_client(flask_app).put(f"/api/students/{student['id']}", json={'class': f"Class {i}"})
+
+    threads = [threading.Thread(target=update, args=(i,)) for i in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    feed = client.get(f'/api/changes?since={seq}').get_json()
+    assert [c['seq'] for c in feed['changes']] == list(range(seq + 1, seq + 13))
+    stored = client.get(f"/api/students/{student['id']}").get_json()
+    assert feed['changes'][-1]['data']['class'] == stored['class']
+
+def test_rotation_keeps_recent_changes(flask_app, monkeypatch):
+    monkeypatch.setattr(app_module, 'CHANGE_FEED_SIZE', 4)
+    client = principal_client(flask_app)
+    start = client.get('/api/changes').get_json()['seq']
+    for i in range(10):
+        add_student(client, f"Student {i}")
+    last = client.get('/api/changes').get_json()['seq']
+    assert last == start + 10
+    assert [c['data']['name'] for c in client.get(f'/api/changes?since={last - 4}').get_json()['changes']] == \
+        [f"Student {i}" for i in range(6, 10)]
+    assert client.get(f'/api/changes?since={start}').status_code == 410
+
+def test_write_without_record_forces_resync(flask_app):
+    client = principal_client(flask_app)
+    add_student(client, 'Asha Rao')
+    seq = client.get('/api/changes').get_json()['seq']
+    with flask_app.app_context():
+        # As if the app crashed between the write and its record
+        students = app_module.load_students()
+        students[0]['class'] = '6B'
+        app_module.save_students(students)
+    response = client.get(f'/api/changes?since={seq}')
+    assert response.status_code == 410
+    new_seq = response.get_json()['seq']
+    assert client.get(f'/api/changes?since={new_seq}').get_json()['changes'] == []
+
+def test_partial_line_is_read_once_complete(flask_app):
+    client = principal_client(flask_app)
+    add_student(client, 'Asha Rao')
+    with flask_app.app_context():
+        path = app_module.store_file('changes')
+        feed = app_module.load_change_feed()
+        record = dict(feed['changes'][-1], seq=feed['last_seq'] + 1)
+        line = json.dumps(record) + '\n'
+        with open(path, 'a') as f:
+            f.write(line[:20])
+        assert app_module.load_change_feed()['last_seq'] == feed['last_seq']
+        with open(path, 'a') as f:
+            f.write(line[20:])
+        assert app_module.load_change_feed()['last_seq'] == feed['last_seq'] + 1
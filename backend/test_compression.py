@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Response compression: br/gzip/identity negotiation, the size threshold,
+encoding-suffixed ETags on 304s, Vary, and the compressed-body cache
+"""
+
+import gzip
+import json
+from collections import OrderedDict
+
+import pytest
+
+import app as app_module
+
+def make_students(count):
+    return [{'id': i, 'name': f"Student {i}", 'dob': '2012-03-04', 'class': '5A', 'roll_number': f"2024{i:03d}"}
+            for i in range(1, count + 1)]
+
+@pytest.fixture
+def client(flask_app, monkeypatch):
+    monkeypatch.setattr(app_module, '_compress_cache', OrderedDict())
+    with flask_app.app_context():
+        app_module.save_students(make_students(40))
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    return client
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(app_module, 'get_brotli', lambda: None)
+
+def test_identity_without_accept_encoding(client):
+    response = client.get('/api/students')
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert not response.headers['ETag'].endswith(('-gzip"', '-br"'))
+    assert len(response.get_json()) == 40
+
+def test_gzip_when_accepted(client, no_brotli):
+    plain = client.get('/api/students')
+    response = client.get('/api/students', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert response.get_etag()[0] == f"{plain.get_etag()[0]}-gzip"
+    assert json.loads(gzip.decompress(response.get_data())) == plain.get_json()
+
+def test_refused_gzip_is_not_used(client, no_brotli):
+    response = client.get('/api/students', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in response.headers
+    assert len(response.get_json()) == 40
+
+def test_br_only_client_gets_identity_without_brotli(client, no_brotli):
+    response = client.get('/api/students', headers={'Accept-Encoding': 'br'})
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+def test_br_when_brotli_is_installed(client):
+    brotli = pytest.importorskip('brotli')
+    plain = client.get('/api/students')
+    response = client.get('/api/students', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_etag()[0] == f"{plain.get_etag()[0]}-br"
+    assert json.loads(brotli.decompress(response.get_data())) == plain.get_json()
+
+def test_small_bodies_are_not_compressed(client, flask_app, no_brotli):
+    with flask_app.app_context():
+        app_module.save_students(make_students(1))
+    response = client.get('/api/students', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.get_data()) < app_module.COMPRESS_MIN_SIZE
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+    assert len(response.get_json()) == 1
+
+@pytest.mark.parametrize('suffix', ['', '-gzip', '-br'])
+def test_suffixed_etag_revalidates(client, suffix):
+    etag = client.get('/api/students').get_etag()[0] + suffix
+    response = client.get('/api/students', headers={'If-None-Match': f'"{etag}"', 'Accept-Encoding': 'gzip, br'})
+    assert response.status_code == 304
+    assert response.get_etag()[0] == etag
+    assert not response.get_data()
+
+def test_gzip_etag_revalidates_after_a_compressed_response(client, no_brotli):
+    etag = client.get('/api/students', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    response = client.get('/api/students', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+def test_suffixed_etag_goes_stale_with_the_data(client, flask_app, no_brotli):
+    etag = client.get('/api/students', headers={'Accept-Encoding': 'gzip'}).headers['ETag']
+    with flask_app.app_context():
+        app_module.save_students(make_students(41))
+    response = client.get('/api/students', headers={'If-None-Match': etag, 'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(json.loads(gzip.decompress(response.get_data()))) == 41
+
+def test_compressed_bodies_are_cached_by_etag(client, no_brotli, monkeypatch):
+    compressed = []
+    compress_body = app_module.compress_body
+    def counting_compress_body(body, encoding):
+        compressed.append(encoding)
+        return compress_body(body, encoding)
+    monkeypatch.setattr(app_module, 'compress_body', counting_compress_body)
+    first = client.get('/api/students', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/api/students', headers={'Accept-Encoding': 'gzip'})
+    assert second.get_data() == first.get_data()
+    assert compressed == ['gzip']
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Bulk face enrollment commit: written under the store write lock, keeping
+what the running app wrote meanwhile and skipping deleted students
+"""
+
+import threading
+
+import app as app_module
+import enroll_faces
+
+STUDENTS = [{'id': 1, 'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A', 'roll_number': '2024001'},
+            {'id': 2, 'name': 'Ravi Kumar', 'dob': '2012-05-06', 'class': '5A', 'roll_number': '2024002'}]
+MATCHES = {'photos/2024001.jpg': '2024001', 'photos/2024003.jpg': '2024003'}
+RESULTS = {'photos/2024001.jpg': [0.1, 0.2], 'photos/2024003.jpg': [0.3, 0.4]}
+
+def test_commit_keeps_concurrent_registrations(flask_app):
+    with flask_app.app_context():
+        app_module.save_students(STUDENTS)
+        app_module.save_face_data({'2024002': {'face_detected': True}})
+        # 2024003 was deleted after the photos were matched
+        assert enroll_faces.commit_enrollments(MATCHES, RESULTS) == 1
+        face_data = app_module.load_face_data()
+    assert sorted(face_data) == ['2024001', '2024002']
+    assert face_data['2024001']['embedding'] == [0.1, 0.2]
+    assert face_data['2024001']['source'] == '2024001.jpg'
+
+def test_commit_waits_for_other_workers(flask_app, other_worker_lock):
+    with flask_app.app_context():
+        app_module.save_students(STUDENTS)
+
+    def commit():
+        with flask_app.app_context():
+            enroll_faces.commit_enrollments(MATCHES, RESULTS)
+
+    with other_worker_lock():
+        thread = threading.Thread(target=commit)
+        thread.start()
+        thread.join(0.3)
+        assert thread.is_alive()
+    thread.join()
+    with flask_app.app_context():
+        assert list(app_module.load_face_data()) == ['2024001']
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Face enrollment jobs: concurrent job updates all land in the jobs file, a
+job is only reported as interrupted once its worker is known to be gone,
+and face data is written under the write lock shared with other workers
+"""
+
+import base64
+import io
+import threading
+import time
+from datetime import datetime, timedelta
+
+from PIL import Image
+
+import pytest
+
+import app as app_module
+
+JOBS = 12
+USER = {'username': 'S001', 'name': 'Student One', 'role': 'student'}
+
+def stored_job(flask_app, **fields):
+    job = {'id': fields.get('id', 'job'), 'student_roll_number': 'S001', 'status': 'running',
+           'frames': 1, 'message': None, 'created_at': datetime.now().isoformat(),
+           'started_at': datetime.now().isoformat(), 'finished_at': None, 'node': 'other'}
+    job.update(fields)
+    with flask_app.app_context():
+        app_module.save_enrollment_jobs({job['id']: job})
+    return job
+
+def test_concurrent_jobs_are_all_kept(flask_app, monkeypatch):
+    def register_face(frames, student_roll_number):
+        time.sleep(0.01)
+        return True, 'Face registered'
+    monkeypatch.setattr(app_module, 'register_face', register_face)
+    monkeypatch.setattr(app_module, 'log_crud_action', lambda *args: None)
+    submitted = []
+    start = threading.Barrier(JOBS)
+
+    def submit():
+        with flask_app.test_request_context():
+            start.wait()
+            submitted.append(app_module.submit_enrollment_job(['frame'], 'S001', USER)['id'])
+
+    threads = [threading.Thread(target=submit) for _ in range(JOBS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with flask_app.app_context():
+        jobs = [app_module.wait_for_enrollment_job(job_id, 10) for job_id in submitted]
+        assert [job['status'] for job in jobs] == ['succeeded'] * JOBS
+        assert sorted(app_module.load_enrollment_jobs()) == sorted(submitted)
+
+def test_job_of_another_worker_is_kept_until_timeout(flask_app):
+    stored_job(flask_app)
+    with flask_app.app_context():
+        assert app_module.get_enrollment_job('job')['status'] == 'running'
+    started = (datetime.now() - timedelta(seconds=app_module.ENROLLMENT_JOB_TIMEOUT + 1)).isoformat()
+    stored_job(flask_app, started_at=started)
+    with flask_app.app_context():
+        assert app_module.get_enrollment_job('job')['status'] == 'failed'
+        assert app_module.load_enrollment_jobs()['job']['status'] == 'failed'
+
+def test_own_job_without_worker_is_failed(flask_app):
+    stored_job(flask_app, node=app_module.NODE_ID)
+    with flask_app.app_context():
+        assert app_module.get_enrollment_job('job')['status'] == 'failed'
+
+def frame():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+    return 'data:image/png;base64,' + base64.b64encode(buffer.getvalue()).decode()
+
+def test_face_data_waits_for_other_workers(flask_app, other_worker_lock):
+    results = []
+
+    def register():
+        with flask_app.app_context():
+            results.append(app_module.register_face([frame()], '2024001'))
+
+    with other_worker_lock():
+        thread = threading.Thread(target=register)
+        thread.start()
+        thread.join(0.3)
+        assert thread.is_alive()
+        with flask_app.app_context():
+            assert app_module.load_face_data() == {}
+    thread.join()
+    assert results[0][0]
+    with flask_app.app_context():
+        assert list(app_module.load_face_data()) == ['2024001']
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Streaming exports: iter_store_items decodes a store file in chunks whatever
+the chunk boundaries, and attendance exports filter by date whatever the
+order of the days in the file
+"""
+
+import json
+
+import pytest
+
+import app as app_module
+
+STORE = {
+    'plain': 1,
+    'esc"aped\\key': 'quote " backslash \\ brace } colon : comma ,',
+    'unicode é中': 'é中\U0001f600 \\u escape \\n',
+    'nested': {'list': [1, 2.5, None, True, {'a': '}'}], 'empty': {}},
+    'last': ''
+}
+
+def write_store_text(flask_app, store, text):
+    with flask_app.app_context():
+        with open(app_module.store_file(store), 'w', encoding='utf-8') as f:
+            f.write(text)
+
+def stored_items(flask_app, store):
+    with flask_app.app_context():
+        return list(app_module.iter_store_items(store))
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 7, 64, 64 * 1024])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_items_across_chunk_boundaries(flask_app, monkeypatch, chunk, indent):
+    monkeypatch.setattr(app_module, 'JSON_STREAM_CHUNK', chunk)
+    write_store_text(flask_app, 'attendance', json.dumps(STORE, indent=indent, ensure_ascii=indent is None))
+    assert stored_items(flask_app, 'attendance') == list(STORE.items())
+
+@pytest.mark.parametrize('text', ['{}', ' \n{ \n }\n'])
+def test_empty_store(flask_app, monkeypatch, text):
+    monkeypatch.setattr(app_module, 'JSON_STREAM_CHUNK', 1)
+    write_store_text(flask_app, 'attendance', text)
+    assert stored_items(flask_app, 'attendance') == []
+
+def test_missing_store(flask_app):
+    assert stored_items(flask_app, 'attendance') == []
+
+@pytest.mark.parametrize('text', ['[]', '{"a": 1', '{"a" 1}'])
+def test_malformed_store(flask_app, text):
+    write_store_text(flask_app, 'attendance', text)
+    with pytest.raises(ValueError):
+        stored_items(flask_app, 'attendance')
+
+def test_export_filters_unsorted_days(flask_app):
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    student = client.post('/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'}).get_json()
+    record = {'status': 'present', 'timestamp': '09:00:00', 'method': 'manual'}
+    days = ['2024-01-03', '2024-01-05', '2024-01-01', '2024-01-04', '2024-01-02']
+    write_store_text(flask_app, 'attendance', json.dumps({day: {str(student['id']): record} for day in days}))
+    response = client.get('/api/export/attendance?format=ndjson&start=2024-01-02&end=2024-01-04')
+    exported = [json.loads(line)['date'] for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(exported) == ['2024-01-02', '2024-01-03', '2024-01-04']
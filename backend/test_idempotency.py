@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Student POSTs: the already-marked fast path and Idempotency-Key replay
+"""
+
+from collections import OrderedDict
+
+import pytest
+
+import app as app_module
+
+@pytest.fixture
+def student(flask_app, monkeypatch):
+    monkeypatch.setattr(app_module, '_idempotency_cache', OrderedDict())
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    client.post('/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'})
+    response = client.post('/student/login', json={'roll_number': '2024001'})
+    assert response.status_code == 200
+    return client
+
+@pytest.fixture
+def face_checks(monkeypatch):
+    calls = []
+    def verify_face(image_data, roll_number):
+        calls.append(roll_number)
+        return True, 'Face verified'
+    monkeypatch.setattr(app_module, 'verify_face', verify_face)
+    return calls
+
+@pytest.fixture
+def face_jobs(monkeypatch):
+    submitted = []
+    def submit_enrollment_job(frames, roll_number, user):
+        submitted.append(frames)
+        return {'id': f"job-{len(submitted)}", 'status': 'queued'}
+    monkeypatch.setattr(app_module, 'submit_enrollment_job', submit_enrollment_job)
+    return submitted
+
+def test_already_marked_skips_face_verification(student, face_checks):
+    first = student.post('/api/student/attendance', json={'image': 'frame'})
+    assert first.status_code == 200
+    assert 'already_marked' not in first.get_json()
+    second = student.post('/api/student/attendance', json={'image': 'frame'})
+    assert second.status_code == 200
+    assert second.get_json()['already_marked'] is True
+    assert second.get_json()['attendance'] == first.get_json()['attendance']
+    assert face_checks == ['2024001']
+
+def test_already_marked_needs_no_image(student, face_checks):
+    student.post('/api/student/attendance', json={'image': 'frame'})
+    response = student.post('/api/student/attendance', json={})
+    assert response.status_code == 200
+    assert response.get_json()['already_marked'] is True
+
+def test_retried_key_replays_the_face_job(student, face_jobs):
+    headers = {'Idempotency-Key': 'enroll-1'}
+    first = student.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    retry = student.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    assert first.status_code == retry.status_code == 202
+    assert 'Idempotent-Replayed' not in first.headers
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == first.get_json()
+    assert len(face_jobs) == 1
+
+def test_new_key_submits_a_new_job(student, face_jobs):
+    student.post('/api/student/face-jobs', json={'frames': ['a']}, headers={'Idempotency-Key': 'enroll-1'})
+    response = student.post('/api/student/face-jobs', json={'frames': ['a']}, headers={'Idempotency-Key': 'enroll-2'})
+    assert 'Idempotent-Replayed' not in response.headers
+    assert response.get_json()['job_id'] == 'job-2'
+    assert len(face_jobs) == 2
+
+def test_failed_attempts_are_not_replayed(student, face_jobs):
+    headers = {'Idempotency-Key': 'enroll-1'}
+    failed = student.post('/api/student/face-jobs', json={'frames': []}, headers=headers)
+    assert failed.status_code == 400
+    response = student.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    assert response.status_code == 202
+    assert 'Idempotent-Replayed' not in response.headers
+
+def test_expired_keys_are_not_replayed(student, face_jobs, monkeypatch):
+    headers = {'Idempotency-Key': 'enroll-1'}
+    monkeypatch.setattr(app_module, 'IDEMPOTENCY_TTL', -1)
+    student.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    response = student.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    assert 'Idempotent-Replayed' not in response.headers
+    assert len(face_jobs) == 2
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Load test reporting: nearest-rank percentiles
+"""
+
+import pytest
+
+import loadtest
+
+@pytest.mark.parametrize('n, pct, rank', [
+    (6, 50, 3),
+    (20, 95, 19),
+    (20, 50, 10),
+    (100, 99, 99),
+    (10, 95, 10),
+    (3, 50, 2),
+    (1, 99, 1),
+    (7, 0, 1),
+    (7, 100, 7),
+])
+def test_nearest_rank_percentile(n, pct, rank):
+    assert loadtest.percentile(list(range(1, n + 1)), pct) == rank
+
+def test_percentile_of_nothing():
+    assert loadtest.percentile([], 50) is None
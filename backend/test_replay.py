@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Access log parsing in replay.py, on werkzeug lines as they appear in
+master.log (plain and ANSI-coloured)
+"""
+
+import os
+import tempfile
+
+import replay
+
+LOG_LINES = [
+    '2025-07-25 06:38:17,311 INFO 127.0.0.1 - - [25/Jul/2025 06:38:17] "POST /login HTTP/1.1" 200 -',
+    # 201: magenta + bold
+    '2025-07-28 20:42:44,339 INFO 127.0.0.1 - - [28/Jul/2025 20:42:44] "\x1b[35m\x1b[1mPOST /api/students HTTP/1.1\x1b[0m" 201 -',
+    # 4xx: red + bold, and yellow for 404
+    '2025-07-28 20:39:51,694 INFO 127.0.0.1 - - [28/Jul/2025 20:39:51] "\x1b[31m\x1b[1mPOST /api/students HTTP/1.1\x1b[0m" 400 -',
+    '2025-07-25 06:37:57,703 INFO 127.0.0.1 - - [25/Jul/2025 06:37:57] "\x1b[33mGET /favicon.ico HTTP/1.1\x1b[0m" 404 -',
+    '2025-07-25 06:38:18,000 INFO CREATE by principal (principal) | Student: A (ID: 1)',
+]
+
+def parse_lines(lines):
+    with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as f:
+        f.write('\n'.join(lines) + '\n')
+    try:
+        return replay.parse_log(f.name)
+    finally:
+        os.remove(f.name)
+
+def test_parses_plain_and_coloured_access_lines():
+    # Oldest first
+    trace = parse_lines(LOG_LINES)
+    assert [(r['method'], r['path'], r['status']) for r in trace] == [
+        ('GET', '/favicon.ico', 404),
+        ('POST', '/login', 200),
+        ('POST', '/api/students', 400),
+        ('POST', '/api/students', 201),
+    ]
+
+def test_skips_other_log_lines():
+    assert parse_lines(LOG_LINES[-1:]) == []
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Shared state between app servers: sessions, revisions and cache invalidation
+travel through a MemoryRedis backend. The second node is a separate copy of
+the app module, so it has its own NODE_ID, caches and revision counters.
+"""
+
+import importlib.util
+import time
+import uuid
+
+import pytest
+
+import app as app_module
+import shared_state
+
+def load_node_module():
+    spec = importlib.util.spec_from_file_location('app_second_node', app_module.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture(scope='module')
+def other_module():
+    return load_node_module()
+
+@pytest.fixture
+def nodes(app_config, other_module, monkeypatch):
+    # Restored after the test, so later apps in this process run without the backend
+    monkeypatch.setattr(app_module, '_shared_backend', None)
+    monkeypatch.setattr(other_module, '_shared_backend', None)
+    config = {**app_config, 'SHARED_BACKEND_URL': f"memory://{uuid.uuid4().hex}"}
+    return app_module.create_app(config), other_module.create_app(config)
+
+def login(client):
+    response = client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    assert response.status_code == 200
+    return client.get_cookie('session').value
+
+def session_id(flask_app, cookie):
+    return shared_state.Signer(flask_app.secret_key, salt='shared-session').unsign(cookie).decode()
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+    return True
+
+def test_session_is_shared_between_nodes(nodes):
+    first, second = nodes
+    cookie = login(first.test_client())
+    client = second.test_client()
+    client.set_cookie('session', cookie)
+    assert client.get('/api/students').status_code == 200
+
+def test_login_issues_a_fresh_session_id(nodes):
+    first, _ = nodes
+    backend = shared_state.connect(first.config['SHARED_BACKEND_URL'])
+    client = first.test_client()
+    old_sid = session_id(first, login(client))
+    new_sid = session_id(first, login(client))
+    assert new_sid != old_sid
+    assert backend.get(shared_state.SESSION_PREFIX + old_sid) is None
+    assert backend.get(shared_state.SESSION_PREFIX + new_sid) is not None
+
+def test_student_login_issues_a_fresh_session_id(nodes):
+    first, _ = nodes
+    backend = shared_state.connect(first.config['SHARED_BACKEND_URL'])
+    client = first.test_client()
+    login(client)
+    client.post('/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'})
+    # A session planted before the student signs in
+    planted_sid = session_id(first, client.get_cookie('session').value)
+    response = client.post('/student/login', json={'roll_number': '2024001'})
+    assert response.status_code == 200
+    student_sid = session_id(first, client.get_cookie('session').value)
+    assert student_sid != planted_sid
+    assert backend.get(shared_state.SESSION_PREFIX + planted_sid) is None
+    assert client.get('/api/student/attendance-history').status_code == 200
+
+def test_write_on_one_node_reaches_the_other(nodes, other_module):
+    first, second = nodes
+    first_client, second_client = first.test_client(), second.test_client()
+    login(first_client)
+    login(second_client)
+    first_client.post('/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'})
+    etag = second_client.get('/api/students').headers['ETag']
+    with second.app_context():
+        path = other_module.store_file('students')
+        other_module.read_store('students')
+        assert path in other_module._store_cache
+    first_client.post('/api/students', json={'name': 'Ravi Kumar', 'dob': '2012-05-06', 'class': '5A'})
+    with first.app_context():
+        rev = app_module.get_revision('students')[0]
+    assert wait_for(lambda: path not in other_module._store_cache)
+    with second.app_context():
+        assert wait_for(lambda: other_module.get_revision('students')[0] == rev)
+    response = second_client.get('/api/students')
+    assert response.headers['ETag'] != etag
+    assert response.headers['ETag'] == first_client.get('/api/students').headers['ETag']
+    assert [s['name'] for s in response.get_json()] == ['Asha Rao', 'Ravi Kumar']
+
+def test_retry_on_another_node_replays_the_face_job(nodes, other_module, monkeypatch):
+    first, second = nodes
+    submitted = []
+    def submit_enrollment_job(frames, roll_number, user):
+        submitted.append(frames)
+        return {'id': f"job-{len(submitted)}", 'status': 'queued'}
+    monkeypatch.setattr(app_module, 'submit_enrollment_job', submit_enrollment_job)
+    monkeypatch.setattr(other_module, 'submit_enrollment_job', submit_enrollment_job)
+    client = first.test_client()
+    login(client)
+    client.post('/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'})
+    client.post('/student/login', json={'roll_number': '2024001'})
+    headers = {'Idempotency-Key': 'enroll-1'}
+    response = client.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    retry_client = second.test_client()
+    retry_client.set_cookie('session', client.get_cookie('session').value)
+    retry = retry_client.post('/api/student/face-jobs', json={'frames': ['a']}, headers=headers)
+    assert retry.status_code == 202
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_json() == response.get_json()
+    assert len(submitted) == 1
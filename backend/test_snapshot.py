@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Snapshot restore: known stores are rewritten, unknown ones are skipped, and
+concurrent writes wait for the whole restore
+"""
+
+import marshal
+import os
+import threading
+import time
+
+import pytest
+
+import app as app_module
+import snapshot
+
+def entry(data):
+    return {'stamp': [0, 0], 'digest': '', 'data': marshal.dumps(data)}
+
+def test_restore_skips_unknown_stores(flask_app, caplog):
+    students = [{'id': 1, 'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A', 'roll_number': '2024001'}]
+    path = os.path.join(flask_app.config['DATA_DIR'], 'restore.snap')
+    snapshot.write_snapshot(path, {'students': entry(students), 'grades': entry({'1': 'A'})})
+    with flask_app.app_context():
+        assert app_module.restore_data_snapshot(path) == 1
+        assert app_module.load_students() == students
+        assert not os.path.exists(os.path.join(flask_app.config['DATA_DIR'], 'grades.json'))
+    assert "'grades'" in caplog.text
+
+def test_writes_wait_for_the_whole_restore(flask_app, monkeypatch):
+    path = os.path.join(flask_app.config['DATA_DIR'], 'restore.snap')
+    snapshot.write_snapshot(path, {'students': entry([]), 'face_data': entry({})})
+    save_students = app_module.save_students
+    students_restored = threading.Event()
+
+    def slow_save_students(students):
+        save_students(students)
+        students_restored.set()
+        time.sleep(0.2)
+    monkeypatch.setattr(app_module, 'save_students', slow_save_students)
+
+    def restore():
+        with flask_app.app_context():
+            app_module.restore_data_snapshot(path)
+
+    thread = threading.Thread(target=restore)
+    thread.start()
+    assert students_restored.wait(5)
+    with flask_app.app_context():
+        # A registration made mid-restore lands after it instead of being overwritten
+        app_module.save_face_data({'2024001': {'face_detected': True}})
+    thread.join()
+    with flask_app.app_context():
+        assert list(app_module.load_face_data()) == ['2024001']
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted static assets in debug mode: the manifest is reused while the
+static folder is unchanged, and only edited files get a new hashed name
+"""
+
+import os
+
+import pytest
+
+import app as app_module
+
+@pytest.fixture
+def flask_app(flask_app, tmp_path):
+    flask_app.static_folder = str(tmp_path / 'static')
+    os.mkdir(flask_app.static_folder)
+    flask_app.debug = True
+    for name, text in (('app.js', 'console.log(1);'), ('style.css', 'body { margin: 0; }')):
+        with open(os.path.join(flask_app.static_folder, name), 'w') as f:
+            f.write(text)
+    return flask_app
+
+def test_manifest_is_reused_until_a_file_changes(flask_app, monkeypatch):
+    with flask_app.test_request_context():
+        manifest = app_module.get_static_manifest()
+        built = []
+        monkeypatch.setattr(app_module.gzip, 'compress', lambda body, **kwargs: built.append(body) or body)
+        assert app_module.get_static_manifest() is manifest
+        assert built == []
+        
+        path = os.path.join(flask_app.static_folder, 'app.js')
+        with open(path, 'w') as f:
+            f.write('console.log(2);')
+        os.utime(path, ns=(0, 0))
+        changed = app_module.get_static_manifest()
+        assert built == [b'console.log(2);']
+        assert changed['files']['app.js'] != manifest['files']['app.js']
+        assert changed['files']['style.css'] == manifest['files']['style.css']
+        assert manifest['files']['app.js'] not in changed['assets']
+
+def test_served_asset_follows_the_edit(flask_app):
+    client = flask_app.test_client()
+    with open(os.path.join(flask_app.static_folder, 'app.js'), 'w') as f:
+        f.write('console.log(3);')
+    os.utime(os.path.join(flask_app.static_folder, 'app.js'), ns=(0, 0))
+    with flask_app.test_request_context():
+        url = app_module.url_for('static', filename='app.js')
+    assert client.get(url).get_data() == b'console.log(3);'
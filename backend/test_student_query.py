@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+/api/students/query: each filter on its own, filters combined, and the
+requests rejected with 400
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+import app as app_module
+
+TODAY = date.today()
+
+def born(age, days_earlier=0):
+    return (app_module.years_before(TODAY, age) - timedelta(days=days_earlier)).isoformat()
+
+STUDENTS = [
+    # Turns 10 today
+    {'id': 1, 'name': 'Asha Rao', 'dob': born(10), 'class': '5A', 'roll_number': '2024001',
+     'created_by': 'teacher1', 'created_at': '2024-01-10T09:00:00'},
+    {'id': 2, 'name': 'Ravi Kumar', 'dob': born(11, 100), 'class': '5A', 'roll_number': '2024002',
+     'created_by': 'teacher2', 'created_at': '2024-02-15T12:00:00'},
+    # Turns 10 tomorrow
+    {'id': 3, 'name': 'Meera Nair', 'dob': born(10, -1), 'class': '6B', 'roll_number': '2024003',
+     'created_by': 'teacher1', 'created_at': '2024-03-01T08:00:00'},
+    {'id': 4, 'name': 'Kabir Das', 'dob': born(12, 200), 'class': '6B', 'roll_number': '2024004',
+     'created_by': 'principal', 'created_at': '2024-03-31T23:59:59'},
+]
+
+@pytest.fixture
+def client(flask_app):
+    with flask_app.app_context():
+        app_module.load_users()
+        app_module.save_students(STUDENTS)
+        app_module.save_face_data({'2024001': {'face_detected': True}, '2024003': {'face_detected': True}})
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    return client
+
+def query(client, params):
+    response = client.get('/api/students/query', query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return [s['id'] for s in response.get_json()]
+
+@pytest.mark.parametrize('params, ids', [
+    ({}, [1, 2, 3, 4]),
+    ({'class': '5A'}, [1, 2]),
+    ({'class': '7C'}, []),
+    ({'min_age': 10}, [1, 2, 4]),
+    ({'max_age': 10}, [1, 3]),
+    ({'min_age': 10, 'max_age': 11}, [1, 2]),
+    ({'min_age': 0, 'max_age': 150}, [1, 2, 3, 4]),
+    ({'dob_from': STUDENTS[0]['dob'], 'dob_to': STUDENTS[2]['dob']}, [1, 3]),
+    ({'dob_to': STUDENTS[1]['dob']}, [2, 4]),
+    ({'created_by': 'teacher1'}, [1, 3]),
+    ({'created_by': 'nobody'}, []),
+    ({'created_from': '2024-02-15', 'created_to': '2024-03-31'}, [2, 3, 4]),
+    ({'created_to': '2024-02-14'}, [1]),
+    ({'created_to': '9999-12-31'}, [1, 2, 3, 4]),
+    ({'face_enrolled': 'true'}, [1, 3]),
+    ({'face_enrolled': 'false'}, [2, 4]),
+])
+def test_single_filters(client, params, ids):
+    assert query(client, params) == ids
+
+@pytest.mark.parametrize('params, ids', [
+    ({'class': '6B', 'face_enrolled': 'true'}, [3]),
+    ({'created_by': 'teacher1', 'min_age': 10}, [1]),
+    ({'class': '5A', 'max_age': 10, 'created_to': '2024-01-31'}, [1]),
+    ({'min_age': 11, 'face_enrolled': '0', 'created_from': '2024-03-01'}, [4]),
+    ({'class': '5A', 'created_by': 'principal'}, []),
+])
+def test_combined_filters(client, params, ids):
+    assert query(client, params) == ids
+
+@pytest.mark.parametrize('params', [
+    {'max_age': 5000},
+    {'min_age': 3000},
+    {'min_age': -10000},
+    {'max_age': -1},
+    {'min_age': 'ten'},
+    {'dob_from': '2012-13-01'},
+    {'created_to': 'yesterday'},
+    {'face_enrolled': 'maybe'},
+])
+def test_invalid_filters(client, params):
+    response = client.get('/api/students/query', query_string=params)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_requires_login(flask_app):
+    assert flask_app.test_client().get('/api/students/query').status_code == 401
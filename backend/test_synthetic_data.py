@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Synthetic datasets: roll numbers stay unique and of one length past 999 students
+"""
+
+import random
+
+import pytest
+
+import synthetic_data
+
+@pytest.mark.parametrize('count, length', [(40, 7), (999, 7), (1000, 8), (12000, 9)])
+def test_roll_numbers_fit_the_dataset(count, length):
+    classes = synthetic_data.class_names(count)
+    students = synthetic_data.make_students(count, classes, synthetic_data.make_users(classes), random.Random(1))
+    rolls = [s['roll_number'] for s in students]
+    assert len(set(rolls)) == count
+    assert {len(roll) for roll in rolls} == {length}
+    assert rolls[-1] == synthetic_data.roll_number(count, count)
+    assert int(rolls[-1][len(synthetic_data.ROLL_PREFIX):]) == count
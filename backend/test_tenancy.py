@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Campus routing: requests reach their campus's stores, while health checks,
+metrics and static files stay reachable without a campus in both
+TENANT_ROUTING modes
+"""
+
+import os
+from collections import OrderedDict
+
+import pytest
+
+import app as app_module
+
+EXEMPT_PATHS = ('/health', '/metrics', '/static/login.css')
+
+@pytest.fixture
+def make_app(app_config, tmp_path, monkeypatch):
+    # Active campuses are per process; start from none so earlier tests' dirs are not reused
+    monkeypatch.setattr(app_module, '_tenants', OrderedDict())
+
+    def make(routing):
+        tenants_dir = tmp_path / 'tenants'
+        os.makedirs(tenants_dir / 'north', exist_ok=True)
+        return app_module.create_app({**app_config, 'TENANT_ROUTING': routing, 'TENANTS_DIR': str(tenants_dir),
+                                      'TRUST_LOCALHOST': True})
+    return make
+
+@pytest.mark.parametrize('path', EXEMPT_PATHS)
+def test_exempt_paths_without_campus_path_routing(make_app, path):
+    client = make_app('path').test_client()
+    assert client.get(path).status_code == 200
+
+@pytest.mark.parametrize('path', EXEMPT_PATHS)
+def test_exempt_paths_without_campus_host_routing(make_app, path):
+    client = make_app('host').test_client()
+    assert client.get(path, base_url='http://localhost').status_code == 200
+
+def test_campus_requests_path_routing(make_app):
+    client = make_app('path').test_client()
+    assert client.get('/north/health').status_code == 200
+    assert client.get('/north/').status_code == 200
+    assert client.get('/south/').status_code == 404
+
+def test_campus_requests_host_routing(make_app):
+    client = make_app('host').test_client()
+    assert client.get('/', base_url='http://north.example.edu').status_code == 200
+    assert client.get('/', base_url='http://south.example.edu').status_code == 404
+
+def test_evicted_campus_drops_its_change_log(make_app):
+    flask_app = make_app('path')
+    flask_app.config['TENANT_CACHE_SIZE'] = 1
+    os.makedirs(os.path.join(flask_app.config['TENANTS_DIR'], 'south'))
+    north_dir = os.path.join(flask_app.config['TENANTS_DIR'], 'north', '')
+    client = flask_app.test_client()
+    client.post('/north/login', json={'username': 'principal', 'password': 'principal123'})
+    client.post('/north/api/students', json={'name': 'Asha Rao', 'dob': '2012-03-04', 'class': '5A'})
+    assert client.get('/north/api/changes').status_code == 200
+    assert any(path.startswith(north_dir) for path in app_module._change_log_cache)
+    assert client.get('/south/').status_code == 200
+    assert not any(path.startswith(north_dir) for path in app_module._change_log_cache)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Trusted clients: /metrics and X-Profile are open to the principal, and to
+localhost only when TRUST_LOCALHOST is set
+"""
+
+import os
+
+import pytest
+
+import app as app_module
+
+@pytest.mark.parametrize('trust_localhost, remote_addr, status', [
+    (False, '127.0.0.1', 403),
+    (True, '127.0.0.1', 200),
+    (True, '::1', 200),
+    (True, '10.0.0.5', 403),
+])
+def test_metrics_from_localhost(app_config, trust_localhost, remote_addr, status):
+    flask_app = app_module.create_app({**app_config, 'TRUST_LOCALHOST': trust_localhost})
+    response = flask_app.test_client().get('/metrics', environ_base={'REMOTE_ADDR': remote_addr})
+    assert response.status_code == status
+
+def test_metrics_for_principal(flask_app):
+    client = flask_app.test_client()
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 200
+
+def profiles(profile_dir):
+    return [name for _, _, files in os.walk(profile_dir) for name in files if name.endswith('.prof')]
+
+def test_profile_header_needs_a_trusted_client(app_config, tmp_path):
+    profile_dir = str(tmp_path / 'profiles')
+    flask_app = app_module.create_app({**app_config, 'PROFILE_DIR': profile_dir})
+    client = flask_app.test_client()
+    assert client.get('/health', headers={'X-Profile': '1'}).status_code == 200
+    assert profiles(profile_dir) == []
+    client.post('/login', json={'username': 'principal', 'password': 'principal123'})
+    assert client.get('/health', headers={'X-Profile': '1'}).status_code == 200
+    assert len(profiles(profile_dir)) == 1
@@ -1,5 +1,13 @@
-from app_vercel import app
+import os
+from app import create_app
 
 # This is the WSGI entry point for Vercel
+app = create_app({
+    'DATA_DIR': os.path.dirname(os.path.abspath(__file__)),
+    'LOG_FILE': None,  # Vercel's filesystem is read-only, log to the console
+    'SNAPSHOT_INTERVAL': 0,  # load a deployed snapshot but never write one
+    'TEMPLATES_AUTO_RELOAD': True
+})
+
 if __name__ == '__main__':
-    app.run() 
\ No newline at end of file
+    app.run()
@@ -9,24 +9,25 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
 
 try:
-    from app_vercel import app
+    from vercel_app import app
     print("✅ Successfully imported Flask app")
     
     # Test basic app configuration
     print(f"✅ App name: {app.name}")
-    print(f"✅ App secret key configured: {'secret_key' in app.config}")
+    print(f"✅ App secret key configured: {bool(app.config.get('SECRET_KEY'))}")
     
     # Test data loading functions
-    from app_vercel import load_users, load_students, load_attendance
+    from app import load_users, load_students, load_attendance
     
-    users = load_users()
-    print(f"✅ Users loaded: {len(users)} users found")
-    
-    students = load_students()
-    print(f"✅ Students loaded: {len(students)} students found")
-    
-    attendance = load_attendance()
-    print(f"✅ Attendance loaded: {len(attendance)} attendance records found")
+    with app.app_context():
+        users = load_users()
+        print(f"✅ Users loaded: {len(users)} users found")
+        
+        students = load_students()
+        print(f"✅ Students loaded: {len(students)} students found")
+        
+        attendance = load_attendance()
+        print(f"✅ Attendance loaded: {len(attendance)} attendance records found")
     
     print("\n🎉 All tests passed! Deployment should work.")
     